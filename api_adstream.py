@@ -1,15 +1,25 @@
-import datetime
-import json
+import hashlib
 import logging
 import os
-import shutil
+import queue
+import threading
 import time
 from pathlib import Path, PurePosixPath
 
 import requests
 
 import config as cfg
+import dedupe_cache
 import get_authentication as getauth
+import http_client
+import job_journal
+import job_ledger
+import media_mover
+import media_stream
+import metrics
+import throttle
+import upload_scheduler
+from log_helpers import LazyJson
 
 # Configuration setup
 config = cfg.get_config()
@@ -18,63 +28,465 @@ root_fsis3 = Path(config["paths"]["root_fsis3_posix"])
 uploaded_rel_path = Path(config["paths"]["upload_dir_posix"])
 uploaded_dir_path = Path(root_fsis3, uploaded_rel_path)
 script_root = config["paths"]["script_root"]
+api_root = config.get("adstream_api_root", "https://a5.adstream.com/api/v2")
+
+upload_config = config.get("upload", {})
+upload_concurrency = upload_config.get("concurrency", 4)
+request_limiter = throttle.TokenBucket(
+    rate=upload_config.get("requests_per_second", 1),
+    capacity=upload_config.get("request_burst", upload_concurrency),
+)
+
+# One byte budget shared by every PUT stream, and an AIMD limit on how many
+# PUTs run at once. bandwidth_mbps of 0 leaves the byte rate unlimited.
+bandwidth_bytes = upload_config.get("bandwidth_mbps", 0) * 1000 * 1000 / 8
+bandwidth_limiter = throttle.TokenBucket(
+    rate=bandwidth_bytes, capacity=max(bandwidth_bytes, media_stream.CHUNK_SIZE)
+)
+# Registering queued media in batches, one POST per register folder.
+batch_register = upload_config.get("batch_register", False)
+batch_size = upload_config.get("batch_size", 20)
+batch_wait = upload_config.get("batch_wait_ms", 200) / 1000
+_batch_supported = True
+
+adaptive_concurrency = upload_config.get("adaptive", True)
+upload_slots = throttle.AdaptiveConcurrency(
+    upload_concurrency, minimum=upload_config.get("min_concurrency", 1)
+)
 
 logger = logging.getLogger(__name__)
 
 
-def new_media_creation(adstream_upload_list):
+def new_media_creation(adstream_upload_list, on_result=None):
     """
     Handles the complete media upload process to Adstream:
     1. Registers a placeholder for the new media.
     2. Uploads the media.
     3. Completes the media creation.
 
+    Media are processed by upload_scheduler workers, which order the queue
+    by priority, age and size and keep large files on their own lane. Each
+    worker takes a token from a shared rate limiter before registering,
+    which replaces the fixed sleep that used to run before every file. The
+    upload list may be a generator; each media is queued as soon as it is
+    produced.
+
+    With upload.batch_register set, media are gathered into batches of up
+    to batch_size, or whatever arrived within batch_wait_ms, and registered
+    with one request per batch before they are queued (see register_batch).
+
     Args:
-        adstream_upload_list (list of dict): List of media files to upload.
+        adstream_upload_list (iterable of dict): Media files to upload.
+        on_result (callable): Called as on_result(media, uploaded) on the
+            worker thread after each media is processed.
 
     Returns:
         dict: Summary of the upload process.
     """
     logger.info("Starting media upload to Adstream")
-    logger.info(
-        f"\n\n=========== AdStream NEW MEDIA LIST ===========:\n{json.dumps(adstream_upload_list, indent=4)}\n"
-    )
 
     media_summary = {"Uploaded Files": [], "Failed Uploads": []}
+    summary_lock = threading.Lock()
+
+    def handle(media, queued_at):
+        try:
+            uploaded = process_media(media, queued_at)
+        except Exception as e:
+            logger.error(f"Unhandled exception uploading {media['File Name']}: {e}")
+            uploaded = False
+
+        key = "Uploaded Files" if uploaded else "Failed Uploads"
+        with summary_lock:
+            media_summary[key].append(media["File Name"])
+        if on_result:
+            on_result(media, uploaded)
+
+    scheduler = upload_scheduler.UploadScheduler(handle, upload_concurrency).start()
+    try:
+        media_list = (media for media in adstream_upload_list if media)
+        if batch_register:
+            batches = iter_batches(media_list, batch_size, batch_wait)
+        else:
+            batches = ([media] for media in media_list)
+
+        for batch in batches:
+            if batch_register:
+                register_batch(batch)
+            for media in batch:
+                logger.info(
+                    "\n\n=========== AdStream NEW MEDIA ===========:\n%s\n",
+                    LazyJson(media),
+                )
+                scheduler.submit(media)
+    finally:
+        scheduler.close()
+        scheduler.join()
+        # Moves and ledger writes run on the mover thread; finish them
+        # before the run is summarised.
+        media_mover.get_mover(uploaded_dir_path).drain()
+
+    return media_summary
+
 
-    for media in adstream_upload_list:
-        if not media:
+def iter_batches(iterable, size, wait):
+    """
+    Group items from a possibly slow iterable into lists of up to `size`.
+
+    A partial batch is yielded once `wait` seconds have passed since its
+    first item arrived, so a slow producer never holds up the items it has
+    already produced. The iterable is consumed on a feeder thread; an
+    exception it raises is re-raised here.
+    """
+    items = queue.Queue()
+    done = object()
+    errors = []
+
+    def feed():
+        try:
+            for item in iterable:
+                items.put(item)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            items.put(done)
+
+    threading.Thread(target=feed, name="batch-feeder", daemon=True).start()
+
+    batch = []
+    deadline = None
+    while True:
+        timeout = max(deadline - time.monotonic(), 0) if batch else None
+        try:
+            item = items.get(timeout=timeout)
+        except queue.Empty:
+            yield batch
+            batch = []
             continue
 
-        time.sleep(10)  # Throttle to avoid overwhelming the server
+        if item is done:
+            break
+        if not batch:
+            deadline = time.monotonic() + wait
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
 
-        vantage_job_id = media["Job Id"]
-        registered_media = register_media(media["File Name"], vantage_job_id)
+    if batch:
+        yield batch
+    if errors:
+        raise errors[0]
 
-        if registered_media:
-            upload_params = prepare_upload_params(media, registered_media)
-            media_params = upload_media(vantage_job_id, **upload_params)
 
-            if media_params:
-                media_finish = media_complete(
-                    vantage_job_id, upload_params["media_path"], **media_params
-                )
-                if media_finish:
-                    media_summary["Uploaded Files"].append(media["File Name"])
-                else:
-                    media_summary["Failed Uploads"].append(media["File Name"])
-            else:
-                logger.error(
-                    f"Media Upload ERROR for {vantage_job_id}, moving to next upload."
-                )
+def register_batch(batch):
+    """
+    Register every media in a batch that still needs registering, with one
+    POST per register folder, and journal each one as REGISTERED.
+
+    Jobs already in the journal, or whose fingerprint matches media already
+    in the destination folder, are left for process_media.
+    Anything the batch call does not register, because the request failed
+    or an item came back without success, is left for process_media to
+    register on its own. If Adstream rejects list bodies outright,
+    batching is switched off for the rest of the process.
+
+    All media currently register under the root folder, so in practice a
+    batch is a single request.
+    """
+    global _batch_supported
+
+    if not _batch_supported:
+        return
+
+    journal = job_journal.get_journal()
+    folders = {}
+    for media in batch:
+        job_id = media["Job Id"]
+        if journal.get(job_id):
+            continue
+
+        fingerprint, duplicate = find_duplicate(media, confirm=False)
+        if duplicate:
+            continue
+
+        folders.setdefault(register_folder_id(media), []).append((media, fingerprint))
+
+    for folder_id, pending in folders.items():
+        if len(pending) < 2:
+            continue
+
+        registered = register_media_list(folder_id, [media for media, _ in pending])
+        if registered is None:
+            return
+
+        for (media, fingerprint), file_info in zip(pending, registered):
+            if file_info is None:
+                continue
+            journal.advance(
+                media["Job Id"],
+                job_journal.REGISTERED,
+                upload_params=prepare_upload_params(media, [file_info]),
+                fingerprint=fingerprint,
+            )
+
+
+def register_folder_id(media):
+    """
+    Adstream folder a media placeholder is registered under.
+    """
+    return root_folder_id
+
+
+@metrics.timed("register_media_batch", failure_values=(None,))
+def register_media_list(folder_id, media_list):
+    """
+    Register placeholders for several media in one request.
+
+    Returns:
+        list or None: One registration entry per media, None for any that
+        did not succeed, or None overall if the request failed.
+    """
+    global _batch_supported
+
+    url = f"{api_root}/folders/{folder_id}/media"
+    json_data = [{"filename": media["File Name"]} for media in media_list]
+    headers = {"Content-Type": "application/json"}
+
+    request_limiter.acquire()
+    try:
+        response = http_client.adstream_session().post(
+            url, headers=headers, json=json_data, auth=getauth.get_provider()
+        )
+        if response.status_code in (400, 404, 405, 415, 422):
+            logger.info(
+                f"Adstream rejected batch registration ({response.status_code}), "
+                "registering one file at a time from now on."
+            )
+            _batch_supported = False
+            return None
+        response.raise_for_status()
+        items = response.json()
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.error(f"Batch media registration failed, falling back to per-file: {e}")
+        return None
+
+    if not isinstance(items, list):
+        logger.error("Batch media registration returned no list, falling back.")
+        return None
+
+    registered = []
+    for index, media in enumerate(media_list):
+        item = items[index] if index < len(items) else None
+        if (
+            isinstance(item, dict)
+            and item.get("status") == "succeeded"
+            and item.get("filename") == media["File Name"]
+        ):
+            registered.append(item)
         else:
+            logger.error(
+                f"Batch registration did not register {media['File Name']}, "
+                "it will be registered on its own."
+            )
+            registered.append(None)
+
+    logger.info(
+        f"Registered {sum(1 for item in registered if item)} of {len(media_list)} "
+        f"media in folder {folder_id} with one request"
+    )
+    return registered
+
+
+def process_media(media, submitted_at=None):
+    """
+    Runs register, upload and complete for a single media file.
+
+    Each finished stage is written to the job journal, so a job that failed
+    or was interrupted part way resumes at its first unfinished stage. Once
+    the upload itself has succeeded the bytes are never sent again.
+
+    Args:
+        media (dict): Media metadata from create_media_dict().
+        submitted_at (float): time.monotonic() when the media was queued.
+
+    Returns:
+        bool: True if the media was created in Adstream, False otherwise.
+    """
+    vantage_job_id = media["Job Id"]
+    waited = request_limiter.acquire()
+    if submitted_at is not None:
+        waited = time.monotonic() - submitted_at
+    metrics.record("queue_wait", waited, key=vantage_job_id)
+
+    journal = job_journal.get_journal()
+    entry = journal.get(vantage_job_id)
+
+    if entry:
+        logger.info(f"Continuing {vantage_job_id} after stage '{entry['stage']}'")
+    else:
+        fingerprint, duplicate = find_duplicate(media)
+        if duplicate:
+            return skip_duplicate(media, duplicate)
+
+        registered_media = register_media(media["File Name"], vantage_job_id)
+
+        if not registered_media:
             logger.error(
                 f"Media Registration ERROR for {vantage_job_id}, moving to next."
             )
+            return False
 
-    return media_summary
+        upload_params = prepare_upload_params(media, registered_media)
+
+        entry = journal.advance(
+            vantage_job_id,
+            job_journal.REGISTERED,
+            upload_params=upload_params,
+            fingerprint=fingerprint,
+        )
+
+    if entry["stage"] == job_journal.REGISTERED:
+        media_params = upload_media(vantage_job_id, **entry["upload_params"])
+
+        if not media_params:
+            logger.error(
+                f"Media Upload ERROR for {vantage_job_id}, moving to next upload."
+            )
+            # A PUT cannot pick up where it stopped, so register afresh
+            # next time.
+            journal.reset(vantage_job_id)
+            return False
 
+        entry = journal.advance(
+            vantage_job_id, job_journal.UPLOADED, upload_params=media_params
+        )
+
+    return finish_media(vantage_job_id, entry)
+
+
+def finish_media(vantage_job_id, entry):
+    """
+    Runs the stages after the upload: complete, move and record.
+
+    The move and the ledger write are handed to the media mover, which
+    runs them off the upload thread unless mover.background is off.
+
+    Args:
+        vantage_job_id (str): Identifier for the Vantage job.
+        entry (dict): The job's latest journal entry.
+
+    Returns:
+        bool: True once the media is complete in Adstream.
+    """
+    journal = job_journal.get_journal()
+    upload_params = entry["upload_params"]
+
+    if entry["stage"] == job_journal.UPLOADED:
+        if not media_complete(vantage_job_id, **upload_params):
+            return False
+        entry = journal.advance(vantage_job_id, job_journal.COMPLETED)
+
+        if entry.get("fingerprint"):
+            dedupe_cache.get_cache().record(
+                entry["fingerprint"],
+                upload_params["fileId"],
+                upload_params["folderId"],
+                upload_params["filename"],
+                upload_params.get("contentHash"),
+            )
+
+    if entry["stage"] == job_journal.COMPLETED:
+        mover = media_mover.get_mover(uploaded_dir_path)
+
+        def on_moved(moved_to):
+            journal.advance(vantage_job_id, job_journal.MOVED, moved_to=moved_to)
+            record_moved(vantage_job_id)
+
+        if media_mover.background:
+            mover.submit(vantage_job_id, upload_params["media_path"], on_moved)
+        else:
+            with metrics.stage("move_with_rename", key=vantage_job_id):
+                on_moved(mover.move(upload_params["media_path"]))
+        return True
+
+    if entry["stage"] == job_journal.MOVED:
+        record_moved(vantage_job_id)
+
+    return True
+
+
+def record_moved(vantage_job_id):
+    """
+    Write the ledger entry for a job whose file has been moved, and close
+    its journal entry.
+    """
+    write_to_joblist(vantage_job_id)
+    job_journal.get_journal().advance(vantage_job_id, job_journal.RECORDED)
+
+
+def find_duplicate(media, confirm=True):
+    """
+    Fingerprints a media file and looks it up in the dedupe cache.
+
+    Args:
+        media (dict): Media metadata from create_media_dict().
+        confirm (bool): Hash the whole file to confirm a match when
+            dedupe.confirm_hash is on (see dedupe_cache.confirm).
+
+    Returns:
+        tuple: (fingerprint or None, dedupe cache entry for identical media
+        in the destination folder or None)
+    """
+    if not dedupe_cache.enabled:
+        return None, None
+
+    try:
+        fingerprint = dedupe_cache.fingerprint(media["File Path"])
+    except OSError as e:
+        logger.error(f"Unable to fingerprint {media['File Path']}: {e}")
+        return None, None
+
+    duplicate = dedupe_cache.get_cache().find(fingerprint, media["folderId"])
+    if (
+        duplicate
+        and confirm
+        and dedupe_cache.confirm_hash
+        and not dedupe_cache.confirm(duplicate, media["File Path"])
+    ):
+        duplicate = None
+    return fingerprint, duplicate
+
+
+def skip_duplicate(media, duplicate):
+    """
+    Completes a job without uploading when identical content is already in
+    the destination Adstream folder.
+
+    Args:
+        media (dict): Media metadata from create_media_dict().
+        duplicate (dict): Dedupe cache entry for the existing Adstream media.
 
+    Returns:
+        bool: Always True; the media is already in Adstream.
+    """
+    logger.info(
+        f"{media['File Name']} is identical to {duplicate['filename']} "
+        f"(fileId {duplicate['fileId']}), skipping upload."
+    )
+    entry = job_journal.get_journal().advance(
+        media["Job Id"],
+        job_journal.COMPLETED,
+        upload_params={
+            "media_path": media["File Path"],
+            "fileId": duplicate["fileId"],
+            "folderId": duplicate["folderId"],
+            "filename": duplicate["filename"],
+        },
+    )
+    return finish_media(media["Job Id"], entry)
+
+
+@metrics.timed("register_media", key_arg=1)
 def register_media(filename, vantage_job_id):
     """
     Registers a placeholder for new media.
@@ -86,13 +498,17 @@ def register_media(filename, vantage_job_id):
     Returns:
         dict or None: Response from the registration request or None if an error occurs.
     """
-    url = f"https://a5.adstream.com/api/v2/folders/{root_folder_id}/media"
+    url = f"{api_root}/folders/{root_folder_id}/media"
     json_data = {"filename": filename}
-    headers = {"Authorization": getauth.get_auth(), "Content-Type": "application/json"}
+    headers = {"Content-Type": "application/json"}
 
     try:
-        response = requests.post(url, headers=headers, json=json_data).json()
-        logger.info(f"MEDIA REGISTER RESPONSE: \n{json.dumps(response, indent=4)}")
+        response = (
+            http_client.adstream_session()
+            .post(url, headers=headers, json=json_data, auth=getauth.get_provider())
+            .json()
+        )
+        logger.info("MEDIA REGISTER RESPONSE: \n%s", LazyJson(response))
 
         if response[0]["status"] == "succeeded":
             logger.info(f"Register media successful for: {filename}")
@@ -133,10 +549,15 @@ def prepare_upload_params(media, registered_media):
     }
 
 
+@metrics.timed("upload_media")
 def upload_media(vantage_job_id, **upload_params):
     """
     Uploads the media file to AdStream.
 
+    The storage url returned by register_media takes the whole object in a
+    single PUT. Adstream documents no multipart or ranged upload for it, so
+    a failed upload is sent again from the first byte.
+
     Args:
         vantage_job_id (str): Identifier for the Vantage job.
         **upload_params: Parameters for the media upload.
@@ -158,50 +579,118 @@ def upload_media(vantage_job_id, **upload_params):
             f"media_path in upload_params is not a POSIX: {type(upload_params['media_path'])}"
         )
 
-    logger.info(f"Upload Params: {json.dumps(upload_params, indent=4)}")
+    logger.info("Upload Params: %s", LazyJson(upload_params))
     logger.info(f"Begin media upload for: {upload_params['filename']}")
 
+    try:
+        large = os.path.getsize(file_path) >= upload_scheduler.large_file_bytes
+    except OSError:
+        large = False
+    upload_slots.acquire(large)
+    started = time.monotonic()
+
     try:
         with open(file_path, "rb") as file:
-            data = file.read()
-            response = requests.put(url, data=data)
+            stream = media_stream.MediaStream(
+                file,
+                filename,
+                hash_factory=hashlib.sha256,
+                limiter=bandwidth_limiter,
+            )
+            response = http_client.adstream_session().put(url, data=stream)
             response.raise_for_status()
+            retries = response_retries(response)
+            metrics.annotate(bytes=stream.bytes_read, retries=retries)
             logger.info(f"Upload Response - status: {response.status_code}")
             if response.status_code not in [200, 201, 202]:
                 logger.error(f"Media Upload for: {filename} returned an empty response")
                 raise Exception
             else:
+                report_transfer(
+                    started, stream.bytes_read, retries, stream.throttled_seconds
+                )
                 logger.info(f"Upload to Adstream complete for: {filename}")
+                upload_params["contentHash"] = stream.hexdigest()
                 return upload_params
 
     except Exception as e:
         logger.error(f"Exception during media upload for {filename}: {e}")
+        report_failure(e)
         cleanup_media_fail(vantage_job_id, filename)
         return None
 
+    finally:
+        upload_slots.release(large)
+
+
+def report_transfer(started, bytes_sent, retries=0, throttled=0.0):
+    """
+    Feed a finished PUT back into the adaptive concurrency limit. Time the
+    stream spent waiting on the bandwidth limiter is left out, since that
+    is our own cap rather than congestion.
+    """
+    if not adaptive_concurrency:
+        return
+    if retries:
+        upload_slots.on_congestion(f"PUT needed {retries} retries")
+    elif bytes_sent:
+        seconds = max(time.monotonic() - started - throttled, 0.0)
+        upload_slots.on_success(seconds / (bytes_sent / (1024 * 1024)), bytes_sent)
+
+
+def report_failure(error):
+    """
+    Back off the adaptive concurrency limit when a PUT was throttled, hit a
+    server error or lost its connection.
+    """
+    if not adaptive_concurrency:
+        return
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    if status == 429 or (status and status >= 500):
+        upload_slots.on_congestion(f"PUT returned {status}")
+    elif isinstance(
+        error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+    ):
+        upload_slots.on_congestion(f"PUT connection error: {error}")
+
+
+def response_retries(response):
+    """
+    Number of retries urllib3 made before returning a response.
+    """
+    retries = getattr(response.raw, "retries", None)
+    return len(retries.history) if retries else 0
+
 
-def media_complete(vantage_job_id, filepath, **media_params):
+@metrics.timed("media_complete")
+def media_complete(vantage_job_id, **media_params):
     """
     Completes the media creation process.
 
     Args:
         vantage_job_id (str): Identifier for the Vantage job.
-        filepath (str): Path to the media file.
         **media_params: Parameters for completing the media creation.
 
     Returns:
         bool: True if the process is successful, False otherwise.
     """
-    url = f"https://a5.adstream.com/api/v2/folders/{media_params['folderId']}/media/{media_params['fileId']}"
+    url = (
+        f"{api_root}/folders/{media_params['folderId']}/media/{media_params['fileId']}"
+    )
     json_data = {
         "meta": {"common": {"name": media_params["filename"]}},
         "subtype": "element",
     }
-    headers = {"Authorization": getauth.get_auth(), "Content-Type": "application/json"}
+    headers = {"Content-Type": "application/json"}
 
     try:
-        response = requests.post(url, headers=headers, json=json_data).json()
-        logger.info(f"media_compelte() Response: {json.dumps(response, indent=4)}")
+        response = (
+            http_client.adstream_session()
+            .post(url, headers=headers, json=json_data, auth=getauth.get_provider())
+            .json()
+        )
+        logger.info("media_compelte() Response: %s", LazyJson(response))
         if isinstance(response, dict):
             logger.info(f"Media completion successful for {media_params['filename']}")
         else:
@@ -217,67 +706,28 @@ def media_complete(vantage_job_id, filepath, **media_params):
         cleanup_media_fail(vantage_job_id, media_params["filename"])
         return False
 
-    move_with_rename(filepath, uploaded_dir_path)
-    write_to_joblist(vantage_job_id)
     return True
 
 
-def move_with_rename(src, dst):
-    output_path = os.path.join(dst, os.path.basename(src))
-    print(f"Output Path: {output_path}")
-    if os.path.exists(output_path):
-        base, ext = os.path.splitext(output_path)
-        counter = 1
-        new_dst = f"{base}_{counter}{ext}"
-
-        # Increment the counter until a non-existing filename is found
-        while os.path.exists(new_dst):
-            counter += 1
-            new_dst = f"{base}_{counter}{ext}"
-
-        dst = new_dst  # Update destination to a unique path
-
-    shutil.move(src, dst)
-    logger.info(f"{os.path.basename(src)} moved to {dst}")
-    return
-
-
 def cleanup_media_fail(vantage_job_id, filename):
     """
-    Cleans up job ID list if media creation fails.
+    Records a failure tombstone in the job ledger if media creation fails.
 
     Args:
         vantage_job_id (str): Identifier for the Vantage job.
         filename (str): Name of the media file.
     """
     logger.info(f"Starting Job ID clean up for - {vantage_job_id}")
-    job_file = "job_id_list.txt"
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d, %H:%M:%S")
-
-    with open(job_file, "r") as file:
-        lines = file.readlines()
 
-    with open(job_file, "w") as file:
-        for line in lines:
-            if line.strip() == vantage_job_id:
-                file.write(
-                    f"[ {timestamp} - Upload Failed for job id: {vantage_job_id} ]\n"
-                )
-                logger.info(
-                    f"Adstream Media Creation Failure - Job ID: {vantage_job_id}, Filename: {filename}"
-                )
-            else:
-                file.write(line)
+    job_ledger.get_ledger().record_failure(vantage_job_id)
+    logger.info(
+        f"Adstream Media Creation Failure - Job ID: {vantage_job_id}, Filename: {filename}"
+    )
 
 
 def write_to_joblist(vantage_job_id):
-    os.chdir(script_root)
-    job_id_list_path = "/Users/admin/Scripts/AdStream-Uploader/job_id_list.txt"
-
-    with open(job_id_list_path, "a+") as f:
-        f.write(f"{vantage_job_id}\n")
-        logger.info("Job Identifier add to the job_list as completed.")
-        f.close()
+    job_ledger.get_ledger().record_upload(vantage_job_id)
+    logger.info("Job Identifier add to the job_list as completed.")
 
 
 if __name__ == "__main__":
@@ -1,13 +1,20 @@
-import json
 import logging
-import os
-import re
-from pathlib import PurePosixPath, PureWindowsPath
-from sys import platform
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import requests
 
 import config as cfg
+import endpoint_selector as selector
+import folder_watcher
+import http_client
+import job_journal
+import job_ledger
+import metrics
+import path_mapping
+import poll_cursor
+import preflight
+from log_helpers import LazyJson
 
 # Configuration and Logger Setup
 config = cfg.get_config()
@@ -15,52 +22,179 @@ logger = logging.getLogger(__name__)
 
 adstream_folders = config["Adstream"]
 endpoint_list = config["vantage"]["endpoint_list"]
-root_unc = config["paths"]["root_unc"]
-root_quan2_posix = config["paths"]["root_quan2_posix"]
-root_fsis3_posix = config["paths"]["root_fsis3_posix"]
 script_root = config["paths"]["script_root"]
 workflow = config["vantage"]["workflows"]["_Info for AdStream Uploads"]
+vantage_port = config["vantage"].get("port", 8676)
+health_check_ttl = config["vantage"].get("health_check_ttl", 60)
+health_check_timeout = config["vantage"].get("health_check_timeout", 5)
+discovery_workers = config["vantage"].get("discovery_workers", 8)
+
+path_mapper = path_mapping.PathMapper(
+    path_mapping.mappings_from_config(config["paths"])
+)
+folder_index = path_mapping.FolderIndex(adstream_folders)
 
 
 def check_workflows(workflow):
     """
     Vantage REST API calls to check workflows for new media and pull variables from jobs.
     """
-    api_endpoint = get_endpoint()
-    root_uri = f"http://{api_endpoint}:8676/"
-    workflow_endpoint = f"{root_uri}/Rest/workflows/{workflow}/jobs"
+    return list(iter_new_media(workflow))
 
-    response = requests.get(workflow_endpoint).json()
-    jobs_list = response.get("Jobs", [])
 
-    logger.info(f"Jobs in the workflow: \n{json.dumps(response, indent=4)}")
-    logger.info("Checking Vantage jobs")
+def iter_new_media(workflow):
+    """
+    Yield media dicts for new jobs in a workflow as their variables arrive.
+
+    Only jobs that are new or changed since the last poll (see poll_cursor)
+    are checked against the job ledger, then the outputs for the remaining
+    jobs are fetched concurrently. Each media dict is yielded as
+    soon as its fetch completes, so uploads can start before discovery ends.
+
+    The discovery threads also stat each file (see preflight). Files that
+    are still being written are held until the end of discovery and checked
+    once more; files that are missing or still changing are deferred. A
+    deferred job stays pending in the poll cursor and has no ledger record,
+    so the next poll picks it up again without counting a failed upload.
+    Jobs with nothing to upload are dropped from the pending set.
+    """
+    response = vantage_get(f"/Rest/workflows/{workflow}/jobs")
+    jobs_list = [
+        job
+        for job in response.get("Jobs", [])
+        if job["Name"] != "_Info for AdStream Uploads"
+    ]
+
+    cursor = poll_cursor.get_cursor(workflow)
+    if cursor.is_unchanged(jobs_list):
+        logger.info("Workflow job list unchanged since the last poll.")
+    else:
+        logger.info("Jobs in the workflow: \n%s", LazyJson(response))
 
-    adstream_upload_list = []
-    duplicate_count = 0
+    candidate_jobs = cursor.changed_jobs(jobs_list)
+    logger.info(
+        f"Checking {len(candidate_jobs)} new or changed Vantage jobs "
+        f"of {len(jobs_list)} in the workflow"
+    )
 
-    for job in jobs_list:
-        if job["Name"] == "_Info for AdStream Uploads":
-            continue
+    new_job_ids = []
 
+    for job in candidate_jobs:
         job_id = check_jobs(job)
         logger.debug(f"Checking Vantage job: {job_id}")
 
         if job_id:
-            kv_dict = get_job_variables(job_id)
-            if kv_dict:
-                media_dict = create_media_dict(kv_dict)
-                adstream_upload_list.append(media_dict)
-            else:
-                continue
+            new_job_ids.append(job_id)
         else:
-            duplicate_count += 1
             logger.debug(f"Job ID: {job['Identifier']} is a duplicate, skipping")
 
-    logger.info("Vantage job check complete.")
+    cursor.update(jobs_list, new_job_ids)
+    cursor.save()
+
+    duplicate_count = len(jobs_list) - len(new_job_ids)
     logger.info(f"Total duplicate jobs skipped = {duplicate_count}")
+    logger.info(f"Fetching variables for {len(new_job_ids)} new jobs")
+
+    unmapped = []
+    settled = []
+    held = []
+    deferred = []
+    if new_job_ids:
+        with ThreadPoolExecutor(
+            max_workers=discovery_workers, thread_name_prefix="discovery"
+        ) as executor:
+            futures = {
+                executor.submit(fetch_media, job_id): job_id for job_id in new_job_ids
+            }
+            for future in as_completed(futures):
+                job_id = futures[future]
+                try:
+                    media, state = future.result()
+                    if not media:
+                        settled.append(job_id)
+                        continue
+                    if state == preflight.READY:
+                        yield media
+                    elif state == preflight.SETTLING:
+                        held.append((media, time.time()))
+                    else:
+                        preflight.log_deferred(media, state)
+                        deferred.append(job_id)
+                except ValueError as e:
+                    unmapped.append(job_id)
+                    logger.error(f"Unable to map media for Job ID {job_id}: {e}")
+                except Exception as e:
+                    logger.error(f"Unable to build media for Job ID {job_id}: {e}")
+
+    ready, settling = preflight.settle(held)
+    yield from ready
+    for media in settling:
+        preflight.log_deferred(media)
+        deferred.append(media["Job Id"])
+
+    if deferred:
+        logger.info(f"{len(deferred)} jobs deferred until their files are ready.")
+    preflight.stat_cache.prune()
+
+    if settled:
+        cursor.settle(settled)
+        cursor.save()
+
+    if unmapped:
+        logger.error(
+            f"{len(unmapped)} jobs have unmappable paths or folders and were "
+            f"not queued: {', '.join(unmapped)}"
+        )
+
+    logger.info("Vantage job check complete.")
+
+
+def fetch_media(job_id):
+    """
+    Fetch a job's variables, build its media dict and run the pre-flight
+    stat on its file. Runs on a discovery thread.
+
+    Returns:
+        tuple: (media dict or None, preflight state)
+    """
+    kv_dict = get_job_variables(job_id)
+    media = create_media_dict(kv_dict) if kv_dict else None
+    if not media:
+        return None, None
+    if job_journal.get_journal().has_reached(job_id, job_journal.UPLOADED):
+        # Already in Adstream; the file may have been moved on since.
+        return media, preflight.READY
+
+    state = preflight.check(media)
+    if state == preflight.MISSING and join_watched_upload(job_id, media):
+        return None, None
+    if state != preflight.MISSING and not folder_watcher.claim(
+        media["File Path"], job_id
+    ):
+        return media, preflight.CLAIMED
+    return media, state
+
+
+def join_watched_upload(job_id, media):
+    """
+    Record a Vantage job as uploaded when the hot-folder watcher already
+    uploaded the latest file at its path, joining the Vantage job id into
+    the ledger.
+
+    Returns:
+        bool: True if the job was joined to a watcher upload.
+    """
+    watched_id = folder_watcher.watched_job_id(media["File Path"])
+    ledger = job_ledger.get_ledger()
+    if watched_id is None or not ledger.is_uploaded(watched_id):
+        return False
 
-    return adstream_upload_list
+    logger.info(
+        f"Job ID {job_id} was uploaded from the hot folder as {watched_id}, "
+        "recording it in the job ledger."
+    )
+    ledger.record_upload(job_id)
+    return True
 
 
 def check_jobs(job):
@@ -75,35 +209,26 @@ def check_jobs(job):
 
     logger.debug(f"Checking job: {job_id}, state: {job_state}")
 
-    os.chdir(script_root)
-    job_id_list_path = "job_id_list.txt"
+    ledger = job_ledger.get_ledger()
 
-    with open(job_id_list_path, "a+") as f:
-        f.seek(0)
-        contents = f.read()
-        failed_job_text = f"Upload Failed for job id: {job_id}"
-
-        if re.search(job_id, contents) and not re.search(failed_job_text, contents):
-            logger.info(
-                "Job Identifier already exists in the job list, setting job_id to None"
-            )
-            return None
-        else:
-            logger.info(
-                "Job Identifier does not exist in the job list, returning id for processing."
-            )
-            return job_id
+    if ledger.is_uploaded(job_id):
+        logger.info(
+            "Job Identifier already exists in the job list, setting job_id to None"
+        )
+        return None
+    else:
+        logger.info(
+            "Job Identifier does not exist in the job list, returning id for processing."
+        )
+        return job_id
 
 
+@metrics.timed("get_job_variables")
 def get_job_variables(job_id):
     """
     Get the job variables from the Vantage workflow.
     """
-    api_endpoint = get_endpoint()
-    root_uri = f"http://{api_endpoint}:8676/"
-    output_endpoint = f"{root_uri}/Rest/jobs/{job_id}/outputs"
-
-    response = requests.get(output_endpoint).json()
+    response = vantage_get(f"/Rest/jobs/{job_id}/outputs", spread=True)
     labels = response.get("Labels", [])
 
     if labels:
@@ -112,7 +237,7 @@ def get_job_variables(job_id):
         for var in vars:
             kv_dict[var["Name"]] = var["Value"]
 
-        logger.info(f"Variables for Job ID {job_id}: {kv_dict}")
+        logger.info("Variables for Job ID %s: %s", job_id, LazyJson(kv_dict))
         return kv_dict
     else:
         logger.info(f"Variables for Job ID {job_id} are empty, returning empty dict")
@@ -122,54 +247,34 @@ def get_job_variables(job_id):
 def create_media_dict(kv_dict):
     """
     Use the media upload list to create a list of dicts with key-value pair info needed for upload to Adstream.
+
+    Returns None for jobs in _DeployToAdStream, which are not uploaded.
+
+    Raises:
+        ValueError: The path has no mapping or its folder has no folderId.
     """
-    media_dict = {}
     job_id = kv_dict["Job Id"]
-    path = kv_dict["File Path"]
-
-    if str(path).startswith("T:\\"):
-        path = str(path).replace("T:\\", "").replace("\\", "/")
-        path = PurePosixPath(root_quan2_posix, path)
-    elif str(path).startswith("\\\\fsis3-smb\\fsis3\\"):
-        path = (
-            str(path)
-            .replace("\\\\fsis3-smb\\fsis3\\", root_fsis3_posix)
-            .replace("\\", "/")
-        )
-        path = PurePosixPath(root_fsis3_posix, path)
-
-    print(f"PATH:  {str(path)}")
-    folder = str(path).rsplit("/")[-2]
+    path, parts = path_mapper.resolve(kv_dict["File Path"])
 
-    logger.info(f"Adstream folder: {folder}\n")
+    if len(parts) < 2:
+        raise ValueError(f"Path '{path}' has no Adstream folder")
+    folder = parts[-2]
 
-    if folder != "_DeployToAdStream":
-        folderId = adstream_folders[folder]
-        filename = kv_dict["File Name"]
+    logger.info(f"Adstream folder: {folder}")
 
-        if platform == "darwin":
-            posix_path = PurePosixPath(path)
+    if folder == "_DeployToAdStream":
+        return None
 
-        media_dict.update(
-            {
-                "Job Id": job_id,
-                "folderId": folderId,
-                "File Name": filename,
-                "File Path": posix_path,
-            }
-        )
+    media_dict = {
+        "Job Id": job_id,
+        "folderId": folder_index.get(folder),
+        "File Name": kv_dict["File Name"],
+        "File Path": path,
+    }
+    if kv_dict.get("Priority"):
+        media_dict["Priority"] = kv_dict["Priority"]
 
-    if isinstance(media_dict["File Path"], PurePosixPath):
-        logger.info(
-            f"'File Path' in media_dict is a POSIX: {type(media_dict['File Path'])}"
-        )
-        media_dict["File Path"] = str(media_dict["File Path"])
-    else:
-        logger.info(
-            f"'File Path' in media_dict is not a POSIX: {type(media_dict['File Path'])}"
-        )
-
-    logger.info(f"Media dict for adstream: \n{json.dumps(media_dict, indent=4)}")
+    logger.info("Media dict for adstream: \n%s", LazyJson(media_dict))
     return media_dict
 
 
@@ -177,33 +282,64 @@ def get_endpoint():
     """
     Select an API endpoint from the list of available Vantage servers.
     """
-    for endpoint in endpoint_list:
-        if endpoint_check(endpoint):
-            logger.info(f"{endpoint.upper()} online status is confirmed.")
-            return endpoint
-        else:
-            logger.error(
-                f"{endpoint.upper()} is not active or unreachable, please check the Vantage SDK service on the host."
-            )
-    raise Exception("Unable to reach any available Vantage Endpoints.")
+    return endpoint_selector.get()
+
+
+def vantage_get(path, spread=False):
+    """
+    GET a Vantage REST path and return the decoded JSON.
+
+    The first healthy endpoint is used unless `spread` is set, in which case
+    requests rotate across all healthy endpoints. An endpoint that errors is
+    marked down and the request fails over to the next healthy one.
+    """
+    attempts = len(endpoint_list)
+
+    for attempt in range(attempts):
+        endpoint = endpoint_selector.next() if spread else endpoint_selector.get()
+        url = f"http://{endpoint}:{vantage_port}{path}"
 
+        try:
+            response = http_client.vantage_session().get(url)
+            response.raise_for_status()
+            return response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.error(f"Vantage request to {url} failed: {e}")
+            endpoint_selector.mark_down(endpoint)
+            if attempt == attempts - 1:
+                raise
 
+
+@metrics.timed("endpoint_check")
 def endpoint_check(endpoint):
     """
     Check the online status of an API endpoint.
     """
-    root_uri = f"http://{endpoint}:8676"
+    root_uri = f"http://{endpoint}:{vantage_port}"
 
     try:
-        response = requests.get(f"{root_uri}/REST/Domain/Online").json()
+        response = (
+            http_client.vantage_session()
+            .get(f"{root_uri}/REST/Domain/Online", timeout=health_check_timeout)
+            .json()
+        )
         status = response.get("Online", False)
         logger.info(f"Endpoint - {endpoint} has the status of {status}")
+        if not status:
+            logger.error(
+                f"{endpoint.upper()} is not active or unreachable, please check the Vantage SDK service on the host."
+            )
         return status
-    except requests.exceptions.RequestException:
+    except (requests.exceptions.RequestException, ValueError):
         logger.error(f"Exception raised on API check for endpoint: {endpoint}.")
         return False
 
 
+endpoint_selector = selector.EndpointSelector(
+    endpoint_list, endpoint_check, ttl=health_check_ttl
+)
+
+
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
     check_workflows(workflow)
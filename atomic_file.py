@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+
+@contextmanager
+def atomic_write(path, mode="w", prefix=None):
+    """
+    Open a temp file next to `path` for writing, and swap it in when the
+    block exits cleanly.
+
+    The temp file is flushed, fsync'd and renamed over `path` with
+    os.replace, then the directory is fsync'd, so a crash leaves either the
+    old file or the new one on disk, never a partial write. If the block
+    raises, the temp file is removed and `path` is left alone.
+
+    Args:
+        path (str): File to replace.
+        mode (str): "w" for text or "wb" for binary.
+        prefix (str): Temp file name prefix, e.g. a hidden ".name." so
+            directory scans skip it. Defaults to "." plus the file name.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    if prefix is None:
+        prefix = f".{os.path.basename(path)}."
+
+    fd, tmp_path = tempfile.mkstemp(prefix=prefix, suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    fsync_dir(directory)
+
+
+def fsync_dir(path):
+    """
+    Flush a directory entry so a rename inside it survives a crash.
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
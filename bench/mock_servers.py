@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for the Vantage REST API and the Adstream v2 API.
+
+Both servers run on 127.0.0.1 in background threads and support a fixed
+per-request latency and a random error rate. The Adstream PUT handler also
+caps its read rate to simulate a limited uplink.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, body, status=200):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"null")
+
+    def simulate(self):
+        """
+        Apply latency and return True if this request should fail.
+        """
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        return random.random() < server.error_rate
+
+
+class VantageHandler(MockHandler):
+    """
+    /REST/Domain/Online, /Rest/workflows/{id}/jobs and /Rest/jobs/{id}/outputs.
+    """
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+
+        if self.path == "/REST/Domain/Online":
+            return self.send_json({"Online": True})
+
+        if self.simulate():
+            return self.send_json({"Error": "mock failure"}, status=500)
+
+        if re.fullmatch(r"/Rest/workflows/[^/]+/jobs", self.path):
+            jobs = [
+                {"Identifier": job_id, "Name": "Mock Job", "State": 5}
+                for job_id in server.jobs
+            ]
+            return self.send_json({"Jobs": jobs})
+
+        match = re.fullmatch(r"/Rest/jobs/([^/]+)/outputs", self.path)
+        if match and match.group(1) in server.jobs:
+            params = [
+                {"Name": name, "Value": value}
+                for name, value in server.jobs[match.group(1)].items()
+            ]
+            return self.send_json({"Labels": [{"Params": params}]})
+
+        self.send_json({"Error": "not found"}, status=404)
+
+
+class AdstreamHandler(MockHandler):
+    """
+    POST /folders/{id}/media, PUT /storage/{id} and POST /folders/{id}/media/{id}.
+    """
+
+    def do_POST(self):
+        server = self.server
+        body = self.read_json()
+
+        if self.simulate():
+            return self.send_json({"error": "mock failure"}, status=500)
+
+        if re.fullmatch(r"/api/v2/folders/[^/]+/media", self.path):
+            items = body if isinstance(body, list) else [body]
+            response = []
+            for item in items:
+                with server.lock:
+                    server.registered += 1
+                    file_id = f"file-{server.registered}"
+                response.append(
+                    {
+                        "id": file_id,
+                        "url": f"http://127.0.0.1:{server.server_port}/storage/{file_id}",
+                        "reference": file_id,
+                        "storageId": f"storage-{file_id}",
+                        "status": "succeeded",
+                        "filename": item["filename"],
+                    }
+                )
+            return self.send_json(response)
+
+        if re.fullmatch(r"/api/v2/folders/[^/]+/media/[^/]+", self.path):
+            with server.lock:
+                server.completed += 1
+            return self.send_json({"id": self.path.rsplit("/", 1)[-1]})
+
+        self.send_json({"error": "not found"}, status=404)
+
+    def do_PUT(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length", 0))
+
+        # A presigned storage url takes the whole object in one PUT; a
+        # ranged PUT would replace it with a single part, so refuse it.
+        if self.headers.get("Content-Range"):
+            self.rfile.read(length)
+            return self.send_json(
+                {"error": "ranged PUT not supported on storage urls"}, status=501
+            )
+        fail = self.simulate()
+
+        remaining = length
+        started = time.monotonic()
+        while remaining:
+            chunk = self.rfile.read(min(remaining, 1024 * 1024))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            if server.bandwidth:
+                received = length - remaining
+                ahead = received / server.bandwidth - (time.monotonic() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+        if fail:
+            return self.send_json({"error": "mock failure"}, status=503)
+
+        with server.lock:
+            server.bytes_received += length
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, handler, latency=0.0, error_rate=0.0, bandwidth=None):
+        super().__init__(("127.0.0.1", 0), handler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.bandwidth = bandwidth
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.registered = 0
+        self.completed = 0
+        self.bytes_received = 0
+        self.jobs = {}
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+
+def start_vantage(jobs, latency=0.0, error_rate=0.0):
+    """
+    Start a mock Vantage server.
+
+    Args:
+        jobs (dict): Job id -> dict of output variables ("File Path", "File Name").
+    """
+    server = MockServer(VantageHandler, latency=latency, error_rate=error_rate)
+    server.jobs = jobs
+    return server.start()
+
+
+def start_adstream(latency=0.0, error_rate=0.0, bandwidth=None):
+    """
+    Start a mock Adstream server.
+
+    Args:
+        bandwidth (float): PUT read rate cap in bytes per second, or None.
+    """
+    server = MockServer(
+        AdstreamHandler, latency=latency, error_rate=error_rate, bandwidth=bandwidth
+    )
+    return server.start()
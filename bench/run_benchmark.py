@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+End-to-end throughput benchmark for the AdStream uploader.
+
+Starts the mock Vantage and Adstream servers from mock_servers.py, builds a
+synthetic media set and a throwaway config.yaml in a temp directory, then
+runs main.main() in a child process against them and reports files per
+minute, MB/s and the child's peak RSS.
+
+    python bench/run_benchmark.py --files 30 --size-mb 50 --bandwidth-mbps 200
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import yaml
+
+import mock_servers
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FOLDER_NAME = "BenchPromos"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=20, help="Media files to upload.")
+    parser.add_argument("--size-mb", type=float, default=10, help="Size of each file.")
+    parser.add_argument("--vantage-latency", type=float, default=0.05)
+    parser.add_argument("--adstream-latency", type=float, default=0.1)
+    parser.add_argument(
+        "--bandwidth-mbps",
+        type=float,
+        default=0,
+        help="Cap on each PUT's read rate in megabits/s (0 = unlimited).",
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--config",
+        type=json.loads,
+        default={},
+        help='JSON merged into the generated config, e.g. \'{"upload": {"concurrency": 8}}\'.',
+    )
+    parser.add_argument("--keep", action="store_true", help="Keep the temp directory.")
+    return parser.parse_args(argv)
+
+
+def build_media_set(fsis3_root, count, size_bytes):
+    """
+    Write `count` files of `size_bytes` and return the mock Vantage job table.
+    """
+    folder = os.path.join(fsis3_root, FOLDER_NAME)
+    os.makedirs(folder, exist_ok=True)
+
+    jobs = {}
+    for number in range(count):
+        filename = f"bench_{number:04d}.mov"
+        # A fresh block per file keeps the dedupe cache from matching them.
+        block = os.urandom(min(size_bytes, 1024 * 1024)) or b"\0"
+        with open(os.path.join(folder, filename), "wb") as f:
+            remaining = size_bytes
+            while remaining > 0:
+                f.write(block[:remaining])
+                remaining -= len(block)
+
+        jobs[str(uuid.uuid4())] = {
+            "File Path": f"\\\\fsis3-smb\\fsis3\\{FOLDER_NAME}\\{filename}",
+            "File Name": filename,
+        }
+    return jobs
+
+
+def write_config(work_dir, vantage, adstream, overrides):
+    fsis3_root = os.path.join(work_dir, "fsis3") + "/"
+    config = {
+        "paths": {
+            "script_root": work_dir,
+            "root_unc": "\\\\fsis3-smb\\fsis3\\",
+            "root_quan2_posix": os.path.join(work_dir, "quan2") + "/",
+            "root_fsis3_posix": fsis3_root,
+            "upload_dir_posix": "_Uploaded",
+        },
+        "vantage": {
+            "endpoint_list": ["127.0.0.1"],
+            "port": vantage.server_port,
+            "workflows": {"_Info for AdStream Uploads": "bench-workflow"},
+        },
+        "Adstream": {"NatGeoPromoExchange": "bench-root", FOLDER_NAME: "bench-folder"},
+        "adstream_api_root": f"http://127.0.0.1:{adstream.server_port}/api/v2",
+        "creds": {"key": "bench", "secret": "bench"},
+        "metrics": {"jsonl_dir": work_dir},
+        # The media set is complete before the run starts.
+        "preflight": {"quiet_seconds": 0},
+    }
+    for section, values in overrides.items():
+        if isinstance(values, dict):
+            config.setdefault(section, {}).update(values)
+        else:
+            config[section] = values
+
+    config_path = os.path.join(work_dir, "config.yaml")
+    with open(config_path, "w") as f:
+        yaml.safe_dump(config, f)
+
+    log_config = {
+        "version": 1,
+        "disable_existing_loggers": False,
+        "handlers": {
+            "console": {
+                "class": "logging.StreamHandler",
+                "level": "WARNING",
+                "stream": "ext://sys.stderr",
+            }
+        },
+        "root": {"level": "INFO", "handlers": ["console"]},
+    }
+    with open(os.path.join(work_dir, "logging.yaml"), "w") as f:
+        yaml.safe_dump(log_config, f)
+
+    os.makedirs(os.path.join(fsis3_root, "_Uploaded"), exist_ok=True)
+    return config_path
+
+
+def peak_child_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux.
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return rss / divisor
+
+
+def run(args):
+    size_bytes = int(args.size_mb * 1024 * 1024)
+    bandwidth = args.bandwidth_mbps * 1000 * 1000 / 8 if args.bandwidth_mbps else None
+
+    with tempfile.TemporaryDirectory(prefix="adstream-bench-") as work_dir:
+        jobs = build_media_set(os.path.join(work_dir, "fsis3"), args.files, size_bytes)
+        vantage = mock_servers.start_vantage(
+            jobs, latency=args.vantage_latency, error_rate=args.error_rate
+        )
+        adstream = mock_servers.start_adstream(
+            latency=args.adstream_latency,
+            error_rate=args.error_rate,
+            bandwidth=bandwidth,
+        )
+        config_path = write_config(work_dir, vantage, adstream, args.config)
+
+        env = dict(os.environ, ADSTREAM_CONFIG=config_path, PYTHONPATH=REPO_ROOT)
+        started = time.monotonic()
+        process = subprocess.run(
+            [sys.executable, "-c", "import main; main.main([])"],
+            cwd=REPO_ROOT,
+            env=env,
+        )
+        elapsed = time.monotonic() - started
+
+        results = {
+            "exit_code": process.returncode,
+            "files": args.files,
+            "file_size_mb": args.size_mb,
+            "uploaded": adstream.completed,
+            "elapsed_seconds": round(elapsed, 3),
+            "files_per_minute": round(adstream.completed / elapsed * 60, 2),
+            "mb_per_sec": round(adstream.bytes_received / elapsed / (1024 * 1024), 2),
+            "peak_rss_mb": round(peak_child_rss_mb(), 1),
+            "vantage_requests": vantage.requests,
+        }
+
+        vantage.shutdown()
+        adstream.shutdown()
+
+        if args.keep:
+            kept = tempfile.mkdtemp(prefix="adstream-bench-kept-")
+            subprocess.run(["cp", "-R", work_dir + "/.", kept])
+            results["work_dir"] = kept
+
+    return results
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run(args)
+    print(json.dumps(results, indent=4))
+    return 0 if results["exit_code"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
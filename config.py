@@ -4,18 +4,28 @@ import os
 
 import yaml
 
+_config = None
+
 
 def get_config():
     """
     Setup configuration and credentials
+
+    config.yaml is parsed once per process; every module shares the result.
+    Set ADSTREAM_CONFIG to load a different file, e.g. for the benchmarks.
     """
-    # path = "/Users/admin/Scripts/AdStream-Uploader/config.yaml"
-    path = "/Users/cucos001/GitHub/Adstream-Uploader/config.yaml"
+    global _config
+
+    if _config is None:
+        # path = "/Users/admin/Scripts/AdStream-Uploader/config.yaml"
+        path = os.environ.get(
+            "ADSTREAM_CONFIG", "/Users/cucos001/GitHub/Adstream-Uploader/config.yaml"
+        )
 
-    with open(path, "rt") as f:
-        config = yaml.safe_load(f.read())
+        with open(path, "rt") as f:
+            _config = yaml.safe_load(f.read())
 
-    return config
+    return _config
 
 
 def ensure_dirs(source_path):
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import logging
+import os
+import threading
+
+import config as cfg
+
+config = cfg.get_config()
+logger = logging.getLogger(__name__)
+
+script_root = config["paths"]["script_root"]
+dedupe_config = config.get("dedupe", {})
+enabled = dedupe_config.get("enabled", True)
+match_mtime = dedupe_config.get("match_mtime", True)
+confirm_hash = dedupe_config.get("confirm_hash", False)
+cache_path = dedupe_config.get(
+    "path", os.path.join(script_root, "json", "dedupe_cache.jsonl")
+)
+
+SAMPLE_SIZE = 256 * 1024
+HASH_CHUNK_SIZE = 1024 * 1024
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+class DedupeCache:
+    """
+    Content fingerprint -> Adstream fileId cache, stored as an append-only
+    JSONL file and indexed in memory by (size, fast hash), with the mtime
+    compared too unless match_mtime is off.
+
+    The fast hash covers the size and three samples from the start, middle
+    and end of the file, so a lookup reads at most 768 KB however large the
+    master is. The full content hash is computed during the upload itself by
+    MediaStream and kept with each entry. With confirm_hash on, a match is
+    also checked against that hash by confirm(), which reads the whole file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._index = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        self._index = {}
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self._index[(entry["size"], entry["fast_hash"])] = entry
+
+        logger.info(f"Dedupe cache loaded: {len(self._index)} entries")
+
+    def find(self, fingerprint, folder_id):
+        """
+        Return the cached entry for an identical file in the same Adstream
+        folder, or None.
+        """
+        entry = self._index.get((fingerprint["size"], fingerprint["fast_hash"]))
+        if not entry:
+            return None
+        if match_mtime and entry["mtime"] != fingerprint["mtime"]:
+            return None
+        if entry["folderId"] != folder_id:
+            logger.info(
+                f"Content already in Adstream as {entry['fileId']} in folder "
+                f"{entry['folderId']}, uploading again for folder {folder_id}."
+            )
+            return None
+        return entry
+
+    def record(self, fingerprint, file_id, folder_id, filename, content_hash=None):
+        entry = {
+            **fingerprint,
+            "content_hash": content_hash,
+            "fileId": file_id,
+            "folderId": folder_id,
+            "filename": filename,
+        }
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+            self._index[(entry["size"], entry["fast_hash"])] = entry
+
+
+def fingerprint(file_path):
+    """
+    Build the (size, mtime, fast hash) fingerprint for a media file.
+    """
+    stat = os.stat(file_path)
+    size = stat.st_size
+    digest = hashlib.blake2b(str(size).encode("utf-8"), digest_size=16)
+
+    with open(file_path, "rb") as f:
+        for offset in sorted(
+            {0, max(size // 2 - SAMPLE_SIZE // 2, 0), max(size - SAMPLE_SIZE, 0)}
+        ):
+            f.seek(offset)
+            digest.update(f.read(SAMPLE_SIZE))
+
+    return {"size": size, "mtime": stat.st_mtime, "fast_hash": digest.hexdigest()}
+
+
+def content_hash(file_path):
+    """
+    SHA-256 of a file's full content, matching the contentHash MediaStream
+    computes during an upload.
+    """
+    digest = hashlib.sha256()
+    buffer = bytearray(HASH_CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(file_path, "rb") as f:
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            digest.update(view[:read])
+    return digest.hexdigest()
+
+
+def confirm(entry, file_path):
+    """
+    Confirm a fingerprint match by hashing the whole file and comparing it
+    with the hash stored for the cached entry. An entry without a stored
+    hash is never trusted.
+
+    Returns:
+        bool: True if the file's content is identical to the cached media.
+    """
+    if not entry.get("content_hash"):
+        return False
+
+    try:
+        matched = content_hash(file_path) == entry["content_hash"]
+    except OSError as e:
+        logger.error(f"Unable to hash {file_path}: {e}")
+        return False
+
+    if not matched:
+        logger.info(
+            f"{file_path} matches the fingerprint of {entry['filename']} but "
+            "not its content hash, uploading it."
+        )
+    return matched
+
+
+def get_cache():
+    """
+    Return the dedupe cache for this process, loading it on first use.
+    """
+    global _cache
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = DedupeCache(cache_path)
+    return _cache
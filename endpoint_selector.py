@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class EndpointSelector:
+    """
+    Picks Vantage endpoints from a TTL cache of health-check results.
+
+    Health checks for all endpoints run in parallel and are only repeated
+    once the cached results are older than `ttl` seconds, or when every
+    cached endpoint has been marked down after a failed request.
+    """
+
+    def __init__(self, endpoints, check, ttl=60):
+        self.endpoints = list(endpoints)
+        self.check = check
+        self.ttl = ttl
+        self._healthy = []
+        self._checked_at = None
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def refresh(self):
+        """
+        Check every endpoint in parallel and cache the healthy ones, keeping
+        the configured preference order.
+        """
+        with self._refresh_lock:
+            with ThreadPoolExecutor(
+                max_workers=len(self.endpoints) or 1, thread_name_prefix="health"
+            ) as executor:
+                results = list(executor.map(self.check, self.endpoints))
+
+            healthy = [
+                endpoint for endpoint, online in zip(self.endpoints, results) if online
+            ]
+            with self._lock:
+                self._healthy = healthy
+                self._checked_at = time.monotonic()
+
+            logger.info(f"Healthy Vantage endpoints: {healthy}")
+            return healthy
+
+    def healthy(self):
+        """
+        Return the cached healthy endpoints, refreshing them if stale or empty.
+        """
+        with self._lock:
+            fresh = (
+                self._checked_at is not None
+                and time.monotonic() - self._checked_at < self.ttl
+            )
+            healthy = list(self._healthy)
+
+        if not fresh or not healthy:
+            healthy = self.refresh()
+
+        if not healthy:
+            raise Exception("Unable to reach any available Vantage Endpoints.")
+        return healthy
+
+    def get(self):
+        """
+        Return the first healthy endpoint in preference order.
+        """
+        return self.healthy()[0]
+
+    def next(self):
+        """
+        Return healthy endpoints in rotation to spread load across nodes.
+        """
+        healthy = self.healthy()
+        return healthy[next(self._counter) % len(healthy)]
+
+    def mark_down(self, endpoint):
+        """
+        Drop an endpoint from the healthy set after a failed request.
+        """
+        with self._lock:
+            if endpoint in self._healthy:
+                self._healthy.remove(endpoint)
+                logger.error(f"{endpoint.upper()} marked down after request error.")
+
+    def start_background(self, interval=None):
+        """
+        Refresh health state on a daemon thread every `interval` seconds.
+        """
+        if self._thread:
+            return
+        interval = interval or self.ttl
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logger.error(f"Background endpoint check failed: {e}")
+
+        self._thread = threading.Thread(target=run, name="endpoint-health", daemon=True)
+        self._thread.start()
+
+    def stop_background(self):
+        self._stop.set()
+        self._thread = None
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+
+import hashlib
+import logging
+import os
+import threading
+import time
+
+import config as cfg
+import preflight
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+config = cfg.get_config()
+logger = logging.getLogger(__name__)
+
+root_fsis3_posix = config["paths"]["root_fsis3_posix"]
+watch_config = config.get("watch", {})
+poll_seconds = watch_config.get("poll_seconds", 2)
+rescan_seconds = watch_config.get("rescan_seconds", 300)
+claim_seconds = watch_config.get("claim_seconds", 3600)
+use_watchdog = watch_config.get("watchdog", True)
+
+JOB_ID_PREFIX = "watch-"
+ignored_folders = {"_DeployToAdStream", config["paths"]["upload_dir_posix"]}
+
+_claims = {}
+_watched = {}
+_claims_lock = threading.Lock()
+
+
+class FolderWatcher:
+    """
+    Discovers media by watching the Adstream folders on the fsis3 mount
+    instead of waiting for Vantage.
+
+    Files are picked up from inotify/FSEvents through watchdog when it is
+    installed, plus a full rescan every rescan_seconds; without watchdog
+    the folders are rescanned every poll_seconds. A candidate is emitted
+    once preflight reports it settled, as a media dict shaped like
+    api_vantage.create_media_dict output. Its job id is derived from the
+    file's path, size and mtime (see watch_job_id), so a re-render under
+    the same name is a new file, and the Vantage job for the file can be
+    joined to it for the ledger when discovery catches up.
+    """
+
+    def __init__(self, folders):
+        self.folders = {
+            path: folder_id
+            for path, folder_id in folders.items()
+            if os.path.isdir(path)
+        }
+        self._candidates = set()
+        self._emitted = {}
+        self._condition = threading.Condition()
+        self._observer = None
+        self._scanned_at = None
+
+    def start(self):
+        if use_watchdog and Observer is not None:
+            self._observer = Observer()
+            handler = _EventHandler(self)
+            for path in self.folders:
+                self._observer.schedule(handler, path, recursive=False)
+            self._observer.start()
+            logger.info(f"Watching {len(self.folders)} Adstream folders with watchdog")
+        else:
+            logger.info(
+                f"Polling {len(self.folders)} Adstream folders every {poll_seconds}s"
+            )
+        return self
+
+    def stop(self):
+        if self._observer:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        with self._condition:
+            self._condition.notify_all()
+
+    def add(self, path):
+        folder = os.path.dirname(path)
+        name = os.path.basename(path)
+        if folder in self.folders and not name.startswith("."):
+            with self._condition:
+                self._candidates.add(path)
+                self._condition.notify_all()
+
+    def scan(self):
+        now = time.monotonic()
+        self._emitted = {
+            path: emitted_at
+            for path, emitted_at in self._emitted.items()
+            if now - emitted_at < claim_seconds
+        }
+        for folder in self.folders:
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        if not entry.is_file():
+                            continue
+                        stat = entry.stat()
+                        key = (entry.path, stat.st_size, stat.st_mtime_ns)
+                        if key not in self._emitted:
+                            self.add(entry.path)
+            except OSError as e:
+                logger.error(f"Unable to scan {folder}: {e}")
+        self._scanned_at = time.monotonic()
+
+    def iter_media(self, stop_event):
+        """
+        Yield media dicts for settled files until `stop_event` is set.
+        """
+        while not stop_event.is_set():
+            interval = rescan_seconds if self._observer else poll_seconds
+            if self._scanned_at is None or (
+                time.monotonic() - self._scanned_at >= interval
+            ):
+                self.scan()
+
+            with self._condition:
+                candidates = list(self._candidates)
+
+            for path in candidates:
+                key = file_key(path)
+                if key is None:
+                    with self._condition:
+                        self._candidates.discard(path)
+                    continue
+
+                media = self.media_for(key)
+                state = preflight.check(media)
+                if state == preflight.SETTLING:
+                    continue
+
+                with self._condition:
+                    self._candidates.discard(path)
+                if key in self._emitted or state != preflight.READY:
+                    continue
+                watched(key, media["Job Id"])
+                if claim(path, media["Job Id"]):
+                    self._emitted[key] = time.monotonic()
+                    logger.info(f"Hot folder picked up {path}")
+                    yield media
+
+            with self._condition:
+                self._condition.wait(poll_seconds)
+
+    def media_for(self, key):
+        path = key[0]
+        return {
+            "Job Id": watch_job_id(key),
+            "folderId": self.folders[os.path.dirname(path)],
+            "File Name": os.path.basename(path),
+            "File Path": path,
+        }
+
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.watcher.add(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.watcher.add(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.watcher.add(event.dest_path)
+
+
+def file_key(path):
+    """
+    Return (path, size, mtime_ns) for a file, or None if it cannot be
+    stat'd. A file rendered again under the same name gets a new key.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (path, stat.st_size, stat.st_mtime_ns)
+
+
+def watch_job_id(key):
+    """
+    Job id for a file found by the watcher, stable for a given file_key.
+    """
+    digest = hashlib.sha1("|".join(str(part) for part in key).encode("utf-8"))
+    return f"{JOB_ID_PREFIX}{digest.hexdigest()[:24]}"
+
+
+def watched(key, job_id):
+    """
+    Remember `job_id` as the watcher's id for the latest settled file at
+    the key's path, for watched_job_id.
+    """
+    now = time.monotonic()
+    with _claims_lock:
+        _watched[key[0]] = (job_id, now + claim_seconds)
+        for stale in [path for path, value in _watched.items() if value[1] <= now]:
+            del _watched[stale]
+
+
+def watched_job_id(path):
+    """
+    Return the watcher's job id for the latest settled file it saw at
+    `path`, or None. Once the file has been moved on, this is the only way
+    to tell which file a Vantage job for the path refers to.
+    """
+    with _claims_lock:
+        entry = _watched.get(path)
+    if entry and entry[1] > time.monotonic():
+        return entry[0]
+    return None
+
+
+def claim(path, owner):
+    """
+    Claim a file for one discovery source so the watcher and Vantage never
+    upload it twice in the same process. Claims are held on the file_key,
+    so a re-render under the same name can be claimed afresh. A claim
+    lapses after claim_seconds, which lets the other source retry a failed
+    upload.
+
+    Returns:
+        bool: True if `owner` holds the claim.
+    """
+    key = file_key(path) or path
+    now = time.monotonic()
+    with _claims_lock:
+        holder = _claims.get(key)
+        if holder and holder[0] != owner and holder[1] > now:
+            return False
+        _claims[key] = (owner, now + claim_seconds)
+
+        # Drop lapsed claims so the table stays the size of the backlog.
+        for stale in [key for key, value in _claims.items() if value[1] <= now]:
+            del _claims[stale]
+        return True
+
+
+def folders_from_config(folder_index):
+    """
+    Map each Adstream folder that exists on the fsis3 mount to its folderId.
+    """
+    folders = {}
+    for name, folder_id in folder_index.items():
+        if name in ignored_folders:
+            continue
+        folders[os.path.join(root_fsis3_posix, name)] = folder_id
+    return folders
@@ -2,25 +2,130 @@
 import base64
 import hashlib
 import hmac
+import logging
+import threading
 import time
+from email.utils import parsedate_to_datetime
+
+import requests
 
 import config as cfg
 
-config = cfg.get_config()
-key = config["creds"]["key"]
-secret_key = config["creds"]["secret"]
+logger = logging.getLogger(__name__)
 
+_provider = None
+_provider_lock = threading.Lock()
 
-def get_auth():
 
-    epoch = str(round(time.time()))
-    message = bytes(key + epoch, "utf-8")
-    secret = bytes(secret_key, "utf-8")
-
-    signature = base64.b64encode(
-        hmac.new(secret, message, digestmod=hashlib.sha256).digest()
-    )
-    hash_decode = signature.decode("utf-8")
-    token = f"{key}:{hash_decode}:{epoch}"
-    auth = f"A5-API {token}"
-    return auth
+class TokenProvider(requests.auth.AuthBase):
+    """
+    Signs and caches the A5-API Authorization header.
+
+    The signed header is reused until it is `refresh_margin` seconds away
+    from the end of its `ttl` window, then signed again. The epoch in the
+    signature is corrected by the clock offset seen in the Date header of
+    Adstream responses, so a drifting local clock does not produce tokens
+    the server rejects. Safe to share between upload threads.
+
+    Pass the provider as `auth=` on a request to sign it and feed the
+    response back in for drift tracking.
+    """
+
+    def __init__(self, key, secret, ttl=30, refresh_margin=5, max_drift_change=2):
+        self.key = key
+        self.secret = secret
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.max_drift_change = max_drift_change
+        self.clock_offset = 0.0
+        self._header = None
+        self._signed_at = None
+        self._lock = threading.Lock()
+
+    def server_time(self):
+        return time.time() + self.clock_offset
+
+    def get(self):
+        """
+        Return a valid Authorization header, signing a new one if needed.
+        """
+        with self._lock:
+            now = self.server_time()
+            if (
+                self._header is None
+                or now - self._signed_at >= self.ttl - self.refresh_margin
+            ):
+                self._header, self._signed_at = self._sign(now)
+            return self._header
+
+    def invalidate(self):
+        with self._lock:
+            self._header = None
+
+    def _sign(self, now):
+        epoch = str(round(now))
+        message = bytes(self.key + epoch, "utf-8")
+        secret = bytes(self.secret, "utf-8")
+
+        signature = base64.b64encode(
+            hmac.new(secret, message, digestmod=hashlib.sha256).digest()
+        )
+        hash_decode = signature.decode("utf-8")
+        token = f"{self.key}:{hash_decode}:{epoch}"
+        return f"A5-API {token}", int(epoch)
+
+    def observe(self, response, **kwargs):
+        """
+        Response hook: track server clock drift and drop the cached token if
+        the server rejected it.
+        """
+        if response.status_code == 401:
+            logger.error("Adstream rejected the auth token, signing a new one.")
+            self.invalidate()
+
+        date_header = response.headers.get("Date")
+        if not date_header:
+            return response
+
+        try:
+            server_now = parsedate_to_datetime(date_header).timestamp()
+        except (TypeError, ValueError):
+            return response
+
+        offset = server_now - time.time()
+        with self._lock:
+            if abs(offset - self.clock_offset) >= self.max_drift_change:
+                logger.info(
+                    f"Adstream clock offset changed to {offset:.1f}s, re-signing."
+                )
+                self.clock_offset = offset
+                self._header = None
+        return response
+
+    def __call__(self, request):
+        request.headers["Authorization"] = self.get()
+        request.register_hook("response", self.observe)
+        return request
+
+
+def get_provider():
+    """
+    Return the shared token provider, reading credentials on first use.
+    """
+    global _provider
+
+    with _provider_lock:
+        if _provider is None:
+            config = cfg.get_config()
+            auth_config = config.get("auth", {})
+            _provider = TokenProvider(
+                config["creds"]["key"],
+                config["creds"]["secret"],
+                ttl=auth_config.get("token_ttl", 30),
+                refresh_margin=auth_config.get("refresh_margin", 5),
+            )
+    return _provider
+
+
+def get_auth():
+    return get_provider().get()
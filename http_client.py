@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import config as cfg
+
+config = cfg.get_config()
+logger = logging.getLogger(__name__)
+
+http_config = config.get("http", {})
+pool_connections = http_config.get("pool_connections", 4)
+pool_maxsize = http_config.get("pool_maxsize", 16)
+connect_timeout = http_config.get("connect_timeout", 10)
+read_timeout = http_config.get("read_timeout", 300)
+retries = http_config.get("retries", 3)
+backoff_factor = http_config.get("backoff_factor", 1)
+
+# POST is left out on purpose: registering media twice would create two
+# placeholders in Adstream. Connection errors are still retried for every
+# method because nothing has reached the server yet.
+RETRY_METHODS = frozenset(["GET", "HEAD", "PUT", "OPTIONS"])
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+class ClientSession(requests.Session):
+    """
+    requests.Session that applies the configured timeout to every request
+    unless the caller passes one.
+    """
+
+    def __init__(self, timeout):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+def build_retry():
+    return Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=RETRY_METHODS,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+def build_session():
+    """
+    Create a pooled keep-alive session with the shared retry rules.
+    """
+    session = ClientSession(timeout=(connect_timeout, read_timeout))
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=build_retry(),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session(name):
+    """
+    Return the shared session for a client, creating it on first use.
+    """
+    with _sessions_lock:
+        if name not in _sessions:
+            logger.debug(f"Creating HTTP session for {name}")
+            _sessions[name] = build_session()
+        return _sessions[name]
+
+
+def vantage_session():
+    return get_session("vantage")
+
+
+def adstream_session():
+    return get_session("adstream")
+
+
+def close_sessions():
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
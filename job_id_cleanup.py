@@ -1,36 +1,104 @@
 #!/usr/bin/env python3
 
-import json
+import argparse
+import datetime
 import logging
-import os
-import time
-from datetime import datetime
-from pathlib import Path
-from time import localtime, strftime
 
 import config as cfg
+import job_ledger
 
 config = cfg.get_config()
 logger = logging.getLogger(__name__)
 
 
-def get_date():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Archive old job ledger records and compact job_id_list.txt."
+    )
+    parser.add_argument(
+        "--retention-days",
+        type=int,
+        default=job_ledger.retention_days,
+        help="Keep records newer than this many days in the hot ledger.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Report what would be archived without changing anything.",
+    )
+    return parser.parse_args(argv)
+
+
+def job_id_cleanup(retention_days=None, dry_run=False):
+    """
+    Move ledger records older than the retention window into gzip'd monthly
+    segments, drop superseded records and rewrite the hot ledger sorted.
+
+    Safe to run alongside uploader processes of any role: the rewrite
+    holds the ledger's lock file (see job_ledger.JobLedger). A daemon also
+    archives the ledger itself once a day, so this is mainly for
+    single-run scheduling.
+
+    Returns:
+        dict: Number of records archived per "YYYY-MM" segment.
+    """
+    if retention_days is None:
+        retention_days = job_ledger.retention_days
+    cutoff = datetime.datetime.now() - datetime.timedelta(days=retention_days)
+
+    ledger = job_ledger.get_ledger()
+    summarize_ledger(ledger.path)
+
+    if dry_run:
+        counts = expired_by_month(ledger.path, cutoff)
+        for month, count in counts.items():
+            logger.info(f"Would archive {count} job ledger records for {month}")
+        return counts
+
+    counts = ledger.archive(cutoff)
+    summarize_ledger(ledger.path)
+    return counts
+
+
+def expired_by_month(ledger_path, cutoff):
     """
-    get todays date and time, use the month value to build a list of log files.
+    Count the dated records in the ledger file older than `cutoff`, by month.
     """
+    latest = {}
+    with open(ledger_path, "r") as f:
+        for line in f:
+            record = job_ledger.parse_record(line)
+            if record:
+                latest[record[0]] = job_ledger.parse_timestamp(record[2])
 
-    today = datetime.today()
-    year = today.strftime("%Y")
-    month = today.strftime("%m")
-    day = today.strftime("%d")
+    counts = {}
+    for recorded_at in latest.values():
+        if recorded_at and recorded_at < cutoff:
+            month = recorded_at.strftime("%Y-%m")
+            counts[month] = counts.get(month, 0) + 1
+    return dict(sorted(counts.items()))
 
-    return year, month, day
 
+def summarize_ledger(ledger_path):
+    """
+    Count the upload and failure records in the ledger file.
+    """
+    counts = {job_ledger.UPLOADED: 0, job_ledger.FAILED: 0}
+
+    with open(ledger_path, "r") as f:
+        for line in f:
+            record = job_ledger.parse_record(line)
+            if record:
+                counts[record[1]] += 1
 
-def job_id_cleanup():
+    logger.info(
+        f"Job ledger {ledger_path}: {counts[job_ledger.UPLOADED]} upload records, "
+        f"{counts[job_ledger.FAILED]} failure records"
+    )
+    return counts
 
-    year, month, day = get_date()
-    prev_month = int(month) - 1
 
-    if len(str(prev_month)) != 2:
-        prev_month = "0" + str(prev_month)
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+    job_id_cleanup(args.retention_days, args.dry_run)
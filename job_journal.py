@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+import datetime
+import json
+import logging
+import os
+import threading
+
+import atomic_file
+import config as cfg
+
+config = cfg.get_config()
+logger = logging.getLogger(__name__)
+
+script_root = config["paths"]["script_root"]
+journal_config = config.get("journal", {})
+journal_path = journal_config.get(
+    "path", os.path.join(script_root, "json", "job_journal.jsonl")
+)
+compact_after = journal_config.get("compact_after", 500)
+
+REGISTERED = "registered"
+UPLOADED = "uploaded"
+COMPLETED = "completed"
+MOVED = "moved"
+RECORDED = "recorded"
+
+STAGES = [REGISTERED, UPLOADED, COMPLETED, MOVED, RECORDED]
+
+_journal = None
+_journal_lock = threading.Lock()
+
+
+class JobJournal:
+    """
+    Durable record of how far each job has got through
+    register -> uploaded -> completed -> moved -> recorded.
+
+    Every stage change is one fsync'd JSON line carrying the stage and any
+    data needed to carry on from it, such as the registered fileId and
+    upload url. The in-memory index holds the latest entry per unfinished
+    job; a job drops out once it reaches RECORDED. Superseded lines are
+    folded away by compact().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._index = {}
+        self._stale = 0
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        self._index = {}
+        self._stale = 0
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self._apply(entry)
+
+        if self._index:
+            logger.info(f"Job journal loaded: {len(self._index)} unfinished jobs")
+
+    def get(self, job_id):
+        """
+        Return the latest entry for an unfinished job, or None.
+        """
+        with self._lock:
+            return self._index.get(job_id)
+
+    def stage(self, job_id):
+        entry = self.get(job_id)
+        return entry["stage"] if entry else None
+
+    def has_reached(self, job_id, stage):
+        current = self.stage(job_id)
+        return current is not None and STAGES.index(current) >= STAGES.index(stage)
+
+    def advance(self, job_id, stage, **data):
+        """
+        Record that a job has finished `stage`. Data from earlier stages is
+        carried forward unless overridden.
+        """
+        with self._lock:
+            previous = self._index.get(job_id, {})
+            entry = {
+                **previous,
+                **data,
+                "job_id": job_id,
+                "stage": stage,
+                "ts": datetime.datetime.now().isoformat(timespec="seconds"),
+            }
+            self._write(entry)
+            self._apply(entry)
+        return entry
+
+    def reset(self, job_id):
+        """
+        Forget a job's progress so its next attempt starts from scratch.
+        """
+        with self._lock:
+            if job_id in self._index:
+                entry = {"job_id": job_id, "stage": None}
+                self._write(entry)
+                self._apply(entry)
+
+    def _write(self, entry):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _apply(self, entry):
+        job_id = entry["job_id"]
+        if job_id in self._index:
+            self._stale += 1
+        if entry["stage"] in (RECORDED, None):
+            self._index.pop(job_id, None)
+            self._stale += 1
+        else:
+            self._index[job_id] = entry
+
+    def compact_if_needed(self):
+        if self._stale >= compact_after:
+            self.compact()
+
+    def compact(self):
+        """
+        Rewrite the journal with only the latest entry for each unfinished
+        job, atomically.
+        """
+        with self._lock:
+            with atomic_file.atomic_write(self.path) as f:
+                for entry in self._index.values():
+                    f.write(json.dumps(entry) + "\n")
+
+            logger.info(
+                f"Job journal compacted: {len(self._index)} unfinished jobs kept."
+            )
+            self._stale = 0
+
+
+def get_journal():
+    """
+    Return the journal for this process, loading it on first use.
+    """
+    global _journal
+
+    with _journal_lock:
+        if _journal is None:
+            _journal = JobJournal(journal_path)
+    return _journal
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+
+import datetime
+import fcntl
+import glob
+import gzip
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+import atomic_file
+import config as cfg
+
+config = cfg.get_config()
+logger = logging.getLogger(__name__)
+
+script_root = config["paths"]["script_root"]
+ledger_config = config.get("ledger", {})
+ledger_path = ledger_config.get("path", os.path.join(script_root, "job_id_list.txt"))
+compact_after = ledger_config.get("compact_after", 1000)
+retention_days = ledger_config.get("retention_days", 90)
+archive_seconds = ledger_config.get("archive_hours", 24) * 3600
+archive_dir = ledger_config.get(
+    "archive_dir", os.path.join(script_root, "job_id_archive")
+)
+
+UPLOADED = "uploaded"
+FAILED = "failed"
+
+UPLOADED_TAG = "UPLOADED"
+FAILED_TAG = "FAILED"
+
+timestamp_formats = ("%Y-%m-%dT%H:%M:%S", "%Y-%m-%d, %H:%M:%S", "%Y-%m-%d %H:%M:%S")
+
+failed_job_regex = re.compile(
+    r"\[ \(?'?(?P<timestamp>.*?)'?,?\)? - Upload Failed for job id: (?P<job_id>[0-9A-Za-z-]+)"
+)
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+class JobLedger:
+    """
+    Job ledger backed by the job_id_list.txt log, with an in-memory index
+    keyed on Vantage job id.
+
+    The log is read once when the ledger is created. Lookups after that are
+    dict lookups and never touch the file again. Every write is a single
+    fsync'd append; superseded records are folded away by compact(), and
+    records older than the retention window are moved out to compressed
+    monthly archives by archive().
+
+    The ids of archived uploads are read back from the archives into a set,
+    so a job Vantage still lists after its record was archived is not
+    uploaded again.
+
+    Every process that writes the ledger, in any role and from
+    job_id_cleanup, coordinates through one lock file next to it: appends
+    hold it shared and rewrites hold it exclusively. A rewrite reloads the
+    log under the exclusive lock first, so records other processes appended
+    since this one loaded it are kept.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._index = {}
+        self._recorded_at = {}
+        self._archived = set()
+        self._archived_at = None
+        self._stale = 0
+        self._lock = threading.Lock()
+        self._lock_file = None
+        self.load()
+
+    def load(self):
+        """
+        Build the index from the log file. Later records win over earlier
+        records for the same job id.
+
+        Legacy upload records carry no timestamp; each takes the time of the
+        nearest dated record before it in the log, e.g. a legacy failure
+        line, so old records keep their rough age.
+        """
+        self._index = {}
+        self._recorded_at = {}
+        self._stale = 0
+        self._archived = load_archived_uploads(archive_dir)
+
+        if not os.path.exists(self.path):
+            logger.info(f"No job ledger found at {self.path}, starting empty.")
+            return
+
+        last_dated = None
+        with open(self.path, "r") as f:
+            for line in f:
+                record = parse_record(line)
+                if not record:
+                    continue
+                job_id, status, timestamp = record
+                recorded_at = parse_timestamp(timestamp)
+                if recorded_at is None:
+                    recorded_at = last_dated
+                else:
+                    last_dated = recorded_at
+                self._apply(job_id, status, recorded_at)
+
+        logger.info(
+            f"Job ledger loaded: {len(self._index)} job ids from {self.path}, "
+            f"{len(self._archived)} archived uploads"
+        )
+
+    def status(self, job_id):
+        """
+        Return UPLOADED, FAILED, or None if the job id has never been seen.
+        """
+        status = self._index.get(job_id)
+        if status is None and job_id in self._archived:
+            return UPLOADED
+        return status
+
+    def is_uploaded(self, job_id):
+        return self.status(job_id) == UPLOADED
+
+    def record_upload(self, job_id):
+        """
+        Append a completed job id to the ledger.
+        """
+        self._append(job_id, UPLOADED, now_timestamp())
+
+    def record_failure(self, job_id, timestamp=None):
+        """
+        Append a failure tombstone for a job id. The job is picked up again on
+        the next poll unless a later upload record supersedes it.
+        """
+        self._append(job_id, FAILED, timestamp or now_timestamp())
+
+    def _append(self, job_id, status, timestamp):
+        with self._lock, self._file_lock(fcntl.LOCK_SH):
+            with open(self.path, "a") as f:
+                f.write(format_record(job_id, status, timestamp))
+                f.flush()
+                os.fsync(f.fileno())
+
+            self._apply(job_id, status, timestamp)
+
+    def _apply(self, job_id, status, timestamp):
+        if job_id in self._index:
+            self._stale += 1
+        self._index[job_id] = status
+        self._recorded_at[job_id] = parse_timestamp(timestamp)
+
+    def compact_if_needed(self):
+        """
+        Compact the ledger once enough superseded records have built up.
+        """
+        if self._stale >= compact_after:
+            self.compact()
+
+    def compact(self):
+        """
+        Rewrite the ledger with one record per job id, oldest first.
+
+        A failure that was later superseded by an upload is dropped here,
+        since only the latest record for each job id is kept. Legacy records
+        with no dated record before them in the log cannot be dated at all;
+        they are stamped with the time of their first compaction and age out
+        together one retention window later.
+        """
+        with self._lock, self._file_lock(fcntl.LOCK_EX):
+            self.load()
+            stale = self._stale
+            self._rewrite()
+
+        logger.info(
+            f"Job ledger compacted: dropped {stale} superseded records, "
+            f"{len(self._index)} job ids kept."
+        )
+
+    def archive(self, cutoff):
+        """
+        Move records older than `cutoff` into gzip'd monthly segments in
+        archive_dir, then compact what is left.
+
+        Segments are appended to, so running the cleanup more than once in a
+        month adds to the same file. The archives are fsync'd before the hot
+        ledger is replaced; a crash in between leaves the records in both
+        places, which is harmless.
+
+        Returns:
+            dict: Number of records archived per "YYYY-MM" segment.
+        """
+        with self._lock, self._file_lock(fcntl.LOCK_EX):
+            self.load()
+            self._stamp_undated()
+            months = {}
+            for job_id, recorded_at in self._recorded_at.items():
+                if recorded_at < cutoff:
+                    months.setdefault(recorded_at.strftime("%Y-%m"), []).append(job_id)
+
+            os.makedirs(archive_dir, exist_ok=True)
+            for month, job_ids in sorted(months.items()):
+                segment = os.path.join(archive_dir, f"job_id_list_{month}.txt.gz")
+                with open(segment, "ab") as raw:
+                    with gzip.GzipFile(fileobj=raw, mode="ab") as f:
+                        for job_id in sorted(job_ids, key=self._sort_key):
+                            record = format_record(
+                                job_id, self._index[job_id], self._recorded_at[job_id]
+                            )
+                            f.write(record.encode("utf-8"))
+                    raw.flush()
+                    os.fsync(raw.fileno())
+
+                for job_id in job_ids:
+                    if self._index.pop(job_id) == UPLOADED:
+                        self._archived.add(job_id)
+                    else:
+                        self._archived.discard(job_id)
+                    del self._recorded_at[job_id]
+
+            if months:
+                atomic_file.fsync_dir(archive_dir)
+            self._rewrite()
+
+        counts = {month: len(job_ids) for month, job_ids in sorted(months.items())}
+        for month, count in counts.items():
+            logger.info(f"Archived {count} job ledger records for {month}")
+        return counts
+
+    def archive_if_due(self):
+        """
+        Archive records older than retention_days if archive_hours have
+        passed since the last time, so a daemon that is never stopped for
+        job_id_cleanup still keeps the hot ledger small.
+
+        Returns:
+            dict or None: Records archived per month, or None if not due.
+        """
+        now = time.monotonic()
+        if self._archived_at is not None and now - self._archived_at < archive_seconds:
+            return None
+        self._archived_at = now
+
+        cutoff = datetime.datetime.now() - datetime.timedelta(days=retention_days)
+        return self.archive(cutoff)
+
+    @contextmanager
+    def _file_lock(self, operation):
+        """
+        Hold the ledger's lock file with LOCK_SH or LOCK_EX, blocking until
+        it is free. Caller holds the lock.
+        """
+        if self._lock_file is None:
+            self._lock_file = open(f"{self.path}.lock", "a+")
+        fcntl.flock(self._lock_file, operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _stamp_undated(self):
+        now = parse_timestamp(now_timestamp())
+        for job_id, recorded_at in self._recorded_at.items():
+            if recorded_at is None:
+                self._recorded_at[job_id] = now
+
+    def _sort_key(self, job_id):
+        return self._recorded_at[job_id], job_id
+
+    def _rewrite(self):
+        """
+        Write the index out as a new ledger, sorted by time then job id.
+
+        The new log is swapped in atomically (see atomic_file), so a crash
+        leaves either the old or the new ledger on disk, never a truncated
+        one. Caller holds the lock.
+        """
+        self._stamp_undated()
+        with atomic_file.atomic_write(self.path) as f:
+            for job_id in sorted(self._index, key=self._sort_key):
+                f.write(
+                    format_record(
+                        job_id, self._index[job_id], self._recorded_at[job_id]
+                    )
+                )
+
+        self._stale = 0
+
+
+def load_archived_uploads(directory):
+    """
+    Return the ids of uploaded jobs in the monthly archive segments. Later
+    segments win, so a job archived as uploaded and later as failed is
+    left out.
+    """
+    archived = set()
+    for segment in sorted(glob.glob(os.path.join(directory, "job_id_list_*.txt.gz"))):
+        try:
+            with gzip.open(segment, "rt") as f:
+                for line in f:
+                    record = parse_record(line)
+                    if not record:
+                        continue
+                    if record[1] == UPLOADED:
+                        archived.add(record[0])
+                    else:
+                        archived.discard(record[0])
+        except (OSError, EOFError) as e:
+            logger.error(f"Unable to read job ledger archive {segment}: {e}")
+    return archived
+
+
+def parse_record(line):
+    """
+    Parse one ledger line into (job_id, status, timestamp), or None for blank
+    or unreadable lines.
+
+    Four record formats are understood:
+        <job_id>\tUPLOADED\t<timestamp>                    - upload
+        <job_id>\tFAILED\t<timestamp>                      - failure tombstone
+        <job_id>                                          - legacy upload
+        [ <timestamp> - Upload Failed for job id: <job_id> ] - legacy failure
+    """
+    line = line.strip()
+    if not line:
+        return None
+
+    if line.startswith("["):
+        match = failed_job_regex.search(line)
+        if match:
+            return match.group("job_id"), FAILED, match.group("timestamp")
+        return None
+
+    fields = line.split("\t")
+    timestamp = fields[2] if len(fields) > 2 else None
+    if len(fields) > 1 and fields[1] == FAILED_TAG:
+        return fields[0], FAILED, timestamp
+
+    return fields[0], UPLOADED, timestamp
+
+
+def format_record(job_id, status, timestamp=None):
+    if isinstance(timestamp, datetime.datetime):
+        timestamp = timestamp.isoformat(timespec="seconds")
+    tag = FAILED_TAG if status == FAILED else UPLOADED_TAG
+    return f"{job_id}\t{tag}\t{timestamp or ''}\n"
+
+
+def parse_timestamp(text):
+    """
+    Parse a ledger timestamp, or return None if it is missing or unreadable.
+    """
+    if isinstance(text, datetime.datetime) or not text:
+        return text or None
+    for timestamp_format in timestamp_formats:
+        try:
+            return datetime.datetime.strptime(text, timestamp_format)
+        except ValueError:
+            continue
+    return None
+
+
+def now_timestamp():
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+
+def get_ledger():
+    """
+    Return the ledger for this process, loading it on first use.
+    """
+    global _ledger
+
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = JobLedger(ledger_path)
+    return _ledger
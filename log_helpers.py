@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+
+DEFAULT_MAX_CHARS = 2000
+
+max_payload_chars = DEFAULT_MAX_CHARS
+_listener = None
+
+
+class LazyJson:
+    """
+    Log argument that serializes a payload only when the record is emitted.
+
+    Use with %-style logging so nothing is built when the level is disabled:
+
+        logger.info("Register response: \\n%s", LazyJson(response))
+
+    Output longer than max_payload_chars is cut off, and lists are prefixed
+    with their length so large job lists stay readable.
+
+    Dicts and lists are shallow-copied when the argument is built, because
+    the listener thread renders it later while the caller may still be
+    changing the payload.
+    """
+
+    def __init__(self, payload, max_chars=None):
+        if isinstance(payload, (dict, list)):
+            payload = payload.copy()
+        self.payload = payload
+        self.max_chars = max_chars
+
+    def __str__(self):
+        try:
+            text = json.dumps(self.payload, indent=4, default=str)
+        except (TypeError, ValueError):
+            text = repr(self.payload)
+
+        if isinstance(self.payload, list):
+            text = f"[{len(self.payload)} items] {text}"
+
+        limit = self.max_chars or max_payload_chars
+        if limit and len(text) > limit:
+            text = f"{text[:limit]}... ({len(text) - limit} more chars truncated)"
+        return text
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread.
+
+    The stock QueueHandler formats the message on the calling thread so the
+    record can be pickled. Records here stay in-process, so the message and
+    any LazyJson arguments are only rendered when the listener writes them.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def start_queue_logging(logger_names=("",)):
+    """
+    Move every handler on the named loggers behind one QueueListener.
+
+    The handlers keep their levels and formatters; callers only pay for
+    putting the record on a queue, and file writes happen on the listener
+    thread.
+    """
+    global _listener
+
+    if _listener is not None:
+        return
+
+    handlers = []
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+
+    for name in logger_names:
+        target = logging.getLogger(name or None)
+        for handler in list(target.handlers):
+            if handler not in handlers:
+                handlers.append(handler)
+            target.removeHandler(handler)
+        target.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, *handlers, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(stop_queue_logging)
+
+
+def stop_queue_logging():
+    """
+    Flush queued records and stop the listener thread.
+    """
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,7 +1,12 @@
+import argparse
 import datetime
+import fcntl
 import logging
 import logging.config
 import os
+import signal
+import threading
+import time
 from time import localtime, strftime
 
 import yaml
@@ -9,9 +14,18 @@ import yaml
 import api_adstream as api_a
 import api_vantage as api_v
 import config as cfg
+import folder_watcher
+import http_client
+import job_journal
+import job_ledger
+import log_helpers
+import metrics
+import work_queue
 
 logger = logging.getLogger(__name__)
 
+_synced_seq = 0
+
 
 # def load_config():
 #     """
@@ -38,6 +52,15 @@ def set_logger(script_root):
 
         logging.config.dictConfig(log_config)
 
+    # Keep payload logging cheap: LazyJson output is capped, and handler I/O
+    # moves to a QueueListener thread unless logging.queue is false.
+    log_options = cfg.get_config().get("logging", {})
+    log_helpers.max_payload_chars = log_options.get(
+        "max_payload_chars", log_helpers.DEFAULT_MAX_CHARS
+    )
+    if log_options.get("queue", True):
+        log_helpers.start_queue_logging(("", "main"))
+
 
 def log_start():
     """
@@ -53,13 +76,14 @@ def log_start():
     logger.info(start_msg)
 
 
-def log_complete(media_summary):
+def log_complete(media_summary, rollup=None):
     """
-    Log the completion of the AdStream upload process.
+    Log the completion of the AdStream upload process, with the per-stage
+    timing rollup for the run if one is given.
     """
     date_end = strftime("%A, %d. %B %Y %I:%M%p", localtime())
-    uploaded_files = media_summary.get("Uploaded Files", ["None"])
-    failed_uploads = media_summary.get("Failed Uploads", ["None"])
+    uploaded_files = media_summary.get("Uploaded Files") or ["None"]
+    failed_uploads = media_summary.get("Failed Uploads") or ["None"]
 
     complete_msg = (
         "\n"
@@ -70,10 +94,33 @@ def log_complete(media_summary):
         f"        Media Failed to Upload: {failed_uploads}\n"
         "================================================================================\n"
     )
+    if rollup:
+        complete_msg += format_rollup(rollup)
     logger.info(complete_msg)
 
 
-def main():
+def format_rollup(rollup):
+    """
+    Format a metrics rollup as a block for the completion log message.
+    """
+    lines = [f"        Run {rollup['run_id']} took {rollup['run_seconds']}s\n"]
+    for name, summary in rollup["stages"].items():
+        line = (
+            f"        {name}: {summary['count']} calls, {summary['failed']} failed, "
+            f"avg {summary['avg_seconds']}s, max {summary['max_seconds']}s"
+        )
+        if "mb_per_sec" in summary:
+            line += f", {summary['bytes']} bytes at {summary['mb_per_sec']} MB/s"
+        if summary.get("retries"):
+            line += f", {summary['retries']} retries"
+        lines.append(line + "\n")
+    lines.append(
+        "================================================================================\n"
+    )
+    return "".join(lines)
+
+
+def main(argv=None):
     """
     Main function to handle AdStream uploads.
 
@@ -86,25 +133,252 @@ def main():
     PUT - Upload the new media: Uploads the media file to Adstream.
     POST - Complete the new media creation: Finalizes the media creation process in Adstream.
 
+    By default a single poll is run and the script exits, as launchd expects with
+    StartInterval. With --daemon the process stays resident and polls on an
+    interval, keeping config, logging, HTTP sessions and the job ledger warm.
+    --watch adds the hot-folder watcher as a second discovery source, which
+    uploads files as soon as they settle in the Adstream folders.
+
+    To spread uploads over several hosts, run one --role discover process,
+    which queues new media in the shared work queue, and a --role worker
+    process on each upload host (see work_queue).
     """
+    args = parse_args(argv)
     config = cfg.get_config()
     script_root = config["paths"]["script_root"]
     set_logger(script_root)
 
-    log_start()
+    if args.role != "all" and not work_queue.queue_path:
+        logger.error(
+            f"--role {args.role} needs queue.path in config, on a volume shared "
+            "by the discover and worker hosts; exiting."
+        )
+        log_helpers.stop_queue_logging()
+        raise SystemExit(2)
+
+    lock_name = "adstream_uploader"
+    if args.role != "all":
+        lock_name = f"adstream_uploader_{args.role}"
+    lock_file = acquire_run_lock(script_root, lock_name)
+    if lock_file is None:
+        logger.info(f"Another AdStream {args.role} run is in progress, exiting.")
+        return
+
+    try:
+        if args.role == "worker":
+            run_worker()
+        elif args.daemon or args.watch:
+            interval = args.interval or config.get("daemon", {}).get("interval", 60)
+            run_daemon(interval, watch=args.watch, role=args.role)
+        else:
+            run_once(args.role)
+    finally:
+        http_client.close_sessions()
+        lock_file.close()
+        log_helpers.stop_queue_logging()
+
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Upload Vantage media to Adstream.")
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Stay resident and poll Vantage on an interval.",
+    )
+    parser.add_argument(
+        "--role",
+        choices=["all", "discover", "worker"],
+        default="all",
+        help="discover: queue new media in the shared work queue; worker: upload "
+        "media from the queue until stopped; all: both in one process (default).",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Also upload files from the Adstream hot folders as they settle (implies --daemon).",
+    )
+    parser.add_argument(
+        "--interval",
+        type=int,
+        help="Seconds between polls in daemon mode (default: daemon.interval or 60).",
+    )
+    return parser.parse_args(argv)
+
+
+def acquire_run_lock(script_root, name="adstream_uploader"):
+    """
+    Take an exclusive, non-blocking lock so two runs never overlap.
+
+    Returns:
+        file or None: The open lock file, or None if another run holds it.
+    """
+    lock_path = os.path.join(script_root, f"{name}.lock")
+    lock_file = open(lock_path, "a+")
+
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+
+    lock_file.seek(0)
+    lock_file.truncate()
+    lock_file.write(f"{os.getpid()}\n")
+    lock_file.flush()
+    return lock_file
+
+
+def run_once(role="all"):
+    """
+    Run a single poll: discover new Vantage jobs and upload them to Adstream,
+    or with the discover role, queue them for the upload workers.
+    """
+    config = cfg.get_config()
     workflow = config["vantage"]["workflows"]["_Info for AdStream Uploads"]
-    adstream_upload_list = api_v.check_workflows(workflow)
 
-    if adstream_upload_list:
-        media_summary = api_a.new_media_creation(adstream_upload_list)
-    else:
-        media_summary = {
-            "Uploaded Files": ["None"],
-            "Failed Uploads": ["None"],
-        }
+    if role == "discover":
+        run_discovery(workflow)
+        return
+
+    metrics.start_run()
+    log_start()
+
+    adstream_upload_list = api_v.iter_new_media(workflow)
+    media_summary = api_a.new_media_creation(adstream_upload_list)
+
+    log_complete(media_summary, metrics.finish_run())
+    job_ledger.get_ledger().compact_if_needed()
+    job_journal.get_journal().compact_if_needed()
+
+
+def run_discovery(workflow):
+    """
+    Queue new media from Vantage in the shared work queue.
+
+    Jobs the workers have finished since the last poll are first copied
+    into the local job ledger, so discovery stops offering them.
+    """
+    global _synced_seq
+
+    queue = work_queue.get_queue()
+    ledger = job_ledger.get_ledger()
+
+    done_job_ids, _synced_seq = queue.done_since(_synced_seq)
+    for job_id in done_job_ids:
+        if not ledger.is_uploaded(job_id):
+            ledger.record_upload(job_id)
+
+    queued = 0
+    for media in api_v.iter_new_media(workflow):
+        if queue.enqueue(media):
+            queued += 1
+
+    logger.info(f"Queued {queued} new media for upload workers: {queue.counts()}")
+    ledger.compact_if_needed()
+
+
+def run_worker():
+    """
+    Upload media claimed from the shared work queue until SIGTERM or SIGINT
+    is received. Media already claimed when the signal arrives are finished.
+    """
+    stop_event = threading.Event()
+    install_stop_handlers(stop_event)
+
+    consumer = work_queue.QueueConsumer(
+        work_queue.get_queue(), max_in_flight=api_a.upload_concurrency * 2
+    )
+    metrics.start_run()
+    log_start()
+
+    try:
+        media_summary = api_a.new_media_creation(
+            consumer.iter_media(stop_event), on_result=consumer.on_result
+        )
+    finally:
+        consumer.close()
+
+    log_complete(media_summary, metrics.finish_run())
+    job_ledger.get_ledger().compact_if_needed()
+    job_journal.get_journal().compact_if_needed()
+
+
+def install_stop_handlers(stop_event):
+    def request_stop(signum, frame):
+        logger.info(f"Received signal {signum}, stopping after the current work.")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+
+def run_daemon(interval, watch=False, role="all"):
+    """
+    Poll on a fixed schedule until SIGTERM or SIGINT is received.
+
+    A poll that is in progress when a signal arrives is allowed to finish.
+    After a poll, records older than the retention window are archived once
+    a day (see job_ledger.JobLedger.archive_if_due). With `watch`, the
+    hot-folder watcher feeds its own upload scheduler on a separate thread
+    for as long as the daemon runs; both share the upload rate and
+    concurrency limits. With the discover role the watcher queues its media
+    in the shared work queue instead, like Vantage discovery.
+    """
+    stop_event = threading.Event()
+    install_stop_handlers(stop_event)
+
+    api_v.endpoint_selector.start_background()
+    logger.info(f"AdStream uploader running in daemon mode, polling every {interval}s")
+
+    watch_thread = None
+    if watch:
+        watcher = folder_watcher.FolderWatcher(
+            folder_watcher.folders_from_config(api_v.folder_index)
+        ).start()
+        watch_thread = threading.Thread(
+            target=run_watcher, args=(watcher, stop_event, role), name="hot-folder"
+        )
+        watch_thread.start()
+
+    while not stop_event.is_set():
+        started = time.monotonic()
+        try:
+            run_once(role)
+        except Exception as e:
+            logger.exception(f"AdStream upload poll failed: {e}")
+
+        try:
+            job_ledger.get_ledger().archive_if_due()
+        except Exception as e:
+            logger.exception(f"Job ledger archival failed: {e}")
+
+        elapsed = time.monotonic() - started
+        stop_event.wait(max(interval - elapsed, 0))
+
+    if watch_thread:
+        watcher.stop()
+        watch_thread.join()
+    api_v.endpoint_selector.stop_background()
+    logger.info("AdStream uploader daemon stopped.")
+
+
+def run_watcher(watcher, stop_event, role="all"):
+    """
+    Upload media from the hot-folder watcher until `stop_event` is set, or
+    with the discover role, queue them for the upload workers.
+    """
+    try:
+        if role == "discover":
+            queue = work_queue.get_queue()
+            for media in watcher.iter_media(stop_event):
+                if queue.enqueue(media):
+                    logger.info(f"Queued {media['File Path']} for upload workers")
+            return
 
-    log_complete(media_summary)
+        media_summary = api_a.new_media_creation(watcher.iter_media(stop_event))
+        log_complete(media_summary)
+    except Exception as e:
+        logger.exception(f"Hot-folder uploads stopped: {e}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+
+import errno
+import logging
+import os
+import queue
+import shutil
+import threading
+
+import atomic_file
+import config as cfg
+import metrics
+
+config = cfg.get_config()
+logger = logging.getLogger(__name__)
+
+mover_config = config.get("mover", {})
+background = mover_config.get("background", True)
+mover_workers = mover_config.get("workers", 1)
+buffer_size = mover_config.get("buffer_mb", 8) * 1024 * 1024
+
+_mover = None
+_mover_lock = threading.Lock()
+
+
+class MediaMover:
+    """
+    Moves uploaded media into the _Uploaded folder off the upload path.
+
+    A move within one filesystem is a single os.replace. A move across
+    volumes, e.g. from the quantum mount to fsis3, is streamed through a
+    fixed buffer into a temp file next to the destination, fsync'd and
+    renamed into place before the source is removed, so a crash never
+    leaves a half-copied file under the final name.
+
+    Free names come from a cached listing of the destination folder rather
+    than a stat per candidate. Each name is claimed with an O_EXCL create,
+    so a file that appeared since the listing was taken is never
+    overwritten; the listing is re-read when that happens.
+    """
+
+    def __init__(self, dst_dir, workers=1):
+        self.dst_dir = str(dst_dir)
+        self.workers = max(workers, 1)
+        self._queue = queue.Queue()
+        self._names = None
+        self._names_lock = threading.Lock()
+        self._dst_dev = None
+        self._threads = []
+
+    def start(self):
+        for number in range(self.workers):
+            thread = threading.Thread(
+                target=self._run, name=f"mover-{number}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def submit(self, key, src, on_done):
+        """
+        Queue a move. `on_done(moved_to)` runs on the mover thread once the
+        file is in place; it is not called if the move fails.
+        """
+        self._queue.put((key, src, on_done))
+
+    def drain(self):
+        """
+        Block until every queued move has finished.
+        """
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            key, src, on_done = self._queue.get()
+            try:
+                with metrics.stage("move_with_rename", key=key):
+                    moved_to = self.move(src)
+                on_done(moved_to)
+            except Exception as e:
+                logger.error(f"Unable to move {src} to {self.dst_dir}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def move(self, src):
+        """
+        Move a file into the destination folder under a free name.
+
+        Returns:
+            str or None: Where the file ended up, or None if it was already
+            gone, e.g. moved by an earlier run that stopped before recording it.
+        """
+        src = str(src)
+        try:
+            src_dev = os.stat(src).st_dev
+        except FileNotFoundError:
+            logger.info(f"{src} is no longer in place, assuming it was already moved.")
+            return None
+
+        dst = self._claim_name(os.path.basename(src))
+        try:
+            if src_dev == self._destination_device():
+                try:
+                    os.replace(src, dst)
+                except OSError as e:
+                    if e.errno != errno.EXDEV:
+                        raise
+                    self._copy_across(src, dst)
+            else:
+                self._copy_across(src, dst)
+        except Exception:
+            self._release_name(dst)
+            raise
+
+        logger.info(f"{os.path.basename(src)} moved to {dst}")
+        return dst
+
+    def _destination_device(self):
+        if self._dst_dev is None:
+            self._dst_dev = os.stat(self.dst_dir).st_dev
+        return self._dst_dev
+
+    def _copy_across(self, src, dst):
+        with open(src, "rb") as source, atomic_file.atomic_write(dst, "wb") as target:
+            buffer = bytearray(buffer_size)
+            view = memoryview(buffer)
+            while True:
+                read = source.readinto(buffer)
+                if not read:
+                    break
+                target.write(view[:read])
+        # copystat takes the path: on macOS it also copies st_flags with
+        # os.chflags, which does not accept a file descriptor.
+        shutil.copystat(src, dst)
+        os.remove(src)
+
+    def _claim_name(self, filename):
+        """
+        Reserve a free name in the destination folder, adding _1, _2, ...
+        before the extension if the name is taken.
+        """
+        base, ext = os.path.splitext(filename)
+        with self._names_lock:
+            if self._names is None:
+                self._names = set(os.listdir(self.dst_dir))
+
+            counter = 0
+            candidate = filename
+            while True:
+                if candidate not in self._names:
+                    path = os.path.join(self.dst_dir, candidate)
+                    try:
+                        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                        self._names.add(candidate)
+                        return path
+                    except FileExistsError:
+                        self._names = set(os.listdir(self.dst_dir))
+                        continue
+                counter += 1
+                candidate = f"{base}_{counter}{ext}"
+
+    def _release_name(self, path):
+        with self._names_lock:
+            try:
+                if os.path.getsize(path) == 0:
+                    os.remove(path)
+                    self._names.discard(os.path.basename(path))
+            except OSError:
+                pass
+
+
+def get_mover(dst_dir):
+    """
+    Return the mover for this process, starting its threads on first use.
+    """
+    global _mover
+
+    with _mover_lock:
+        if _mover is None:
+            _mover = MediaMover(dst_dir, workers=mover_workers).start()
+    return _mover
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+PROGRESS_STEP = 10
+
+
+class MediaStream:
+    """
+    Read-only, file-like view of an open media file for streaming uploads.
+
+    requests sends any object with read() and __len__ as a streamed body
+    with a Content-Length header, pulling one block at a time. Memory use
+    stays at a single block no matter how large the file is.
+
+    Pass a hashlib constructor as `hash_factory` to hash the content as it
+    is sent, without a second read of the file, and a shared
+    throttle.TokenBucket as `limiter` to cap the combined byte rate. Time
+    spent waiting on the limiter is kept in `throttled_seconds`.
+    """
+
+    def __init__(
+        self, file, filename, chunk_size=CHUNK_SIZE, hash_factory=None, limiter=None
+    ):
+        self.file = file
+        self.filename = filename
+        self.chunk_size = chunk_size
+        self.hash_factory = hash_factory
+        self.limiter = limiter
+        self.hasher = hash_factory() if hash_factory else None
+        self.offset = file.tell()
+        self.total_bytes = os.fstat(file.fileno()).st_size - self.offset
+        self.bytes_read = 0
+        self.throttled_seconds = 0.0
+        self.started = time.monotonic()
+        self._next_progress = PROGRESS_STEP
+
+    def __len__(self):
+        return self.total_bytes
+
+    def tell(self):
+        return self.bytes_read
+
+    def seek(self, position, whence=os.SEEK_SET):
+        """
+        Rewind to a position within the stream so the HTTP layer can resend
+        the body when it retries a request.
+        """
+        if whence != os.SEEK_SET:
+            raise OSError("MediaStream only supports absolute seeks")
+        self.file.seek(self.offset + position)
+        self.bytes_read = position
+        # A rewind to the start restarts the hash; any other seek makes it
+        # impossible to hash the content in order, so hashing stops.
+        if self.hash_factory:
+            self.hasher = self.hash_factory() if position == 0 else None
+        self._next_progress = PROGRESS_STEP
+        return position
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.chunk_size
+
+        if self.limiter:
+            self.throttled_seconds += self.limiter.acquire(size)
+        chunk = self.file.read(size)
+        self.bytes_read += len(chunk)
+        if self.hasher:
+            self.hasher.update(chunk)
+        self._report_progress()
+        return chunk
+
+    def hexdigest(self):
+        """
+        Content hash of the bytes streamed so far, or None if not hashing.
+        """
+        return self.hasher.hexdigest() if self.hasher else None
+
+    def _report_progress(self):
+        if not self.total_bytes:
+            return
+
+        percent = self.bytes_read * 100 // self.total_bytes
+        if percent < self._next_progress:
+            return
+
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        mb_per_sec = self.bytes_read / elapsed / (1024 * 1024)
+        logger.info(
+            f"Upload progress for {self.filename}: {percent}% "
+            f"({self.bytes_read}/{self.total_bytes} bytes, {mb_per_sec:.1f} MB/s)"
+        )
+        self._next_progress = (percent // PROGRESS_STEP + 1) * PROGRESS_STEP
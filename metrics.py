@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+
+import datetime
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import atomic_file
+import config as cfg
+
+config = cfg.get_config()
+logger = logging.getLogger(__name__)
+
+script_root = config["paths"]["script_root"]
+metrics_config = config.get("metrics", {})
+enabled = metrics_config.get("enabled", True)
+jsonl_dir = metrics_config.get("jsonl_dir", os.path.join(script_root, "_logs"))
+prometheus_textfile = metrics_config.get("prometheus_textfile")
+
+_local = threading.local()
+
+
+class MetricsRecorder:
+    """
+    Collects stage records for one run and appends each one to a JSONL file.
+    """
+
+    def __init__(self):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started = time.time()
+        self.records = []
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        record = {
+            "ts": datetime.datetime.now().isoformat(timespec="milliseconds"),
+            "run_id": self.run_id,
+            **record,
+        }
+        if record.get("bytes") and record.get("seconds"):
+            record["mb_per_sec"] = round(
+                record["bytes"] / record["seconds"] / (1024 * 1024), 3
+            )
+
+        with self._lock:
+            self.records.append(record)
+            if enabled:
+                self._write(record)
+
+    def _write(self, record):
+        today = datetime.datetime.today().strftime("%Y%m%d")
+        path = os.path.join(jsonl_dir, f"metrics_{today}.jsonl")
+        try:
+            with open(path, "a") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+        except OSError as e:
+            logger.error(f"Unable to write metrics record to {path}: {e}")
+
+    def rollup(self):
+        """
+        Summarise the run per stage: count, failures, latency, bytes and MB/s.
+        """
+        with self._lock:
+            records = list(self.records)
+
+        stages = {}
+        for record in records:
+            summary = stages.setdefault(
+                record["stage"],
+                {"count": 0, "failed": 0, "seconds": 0.0, "max_seconds": 0.0},
+            )
+            summary["count"] += 1
+            summary["failed"] += 0 if record.get("ok", True) else 1
+            summary["seconds"] += record.get("seconds", 0.0)
+            summary["max_seconds"] = max(
+                summary["max_seconds"], record.get("seconds", 0.0)
+            )
+            if "bytes" in record:
+                summary["bytes"] = summary.get("bytes", 0) + record["bytes"]
+            if "retries" in record:
+                summary["retries"] = summary.get("retries", 0) + record["retries"]
+
+        for summary in stages.values():
+            summary["avg_seconds"] = round(summary["seconds"] / summary["count"], 3)
+            summary["seconds"] = round(summary["seconds"], 3)
+            summary["max_seconds"] = round(summary["max_seconds"], 3)
+            if summary.get("bytes") and summary["seconds"]:
+                summary["mb_per_sec"] = round(
+                    summary["bytes"] / summary["seconds"] / (1024 * 1024), 3
+                )
+
+        return {
+            "run_id": self.run_id,
+            "run_seconds": round(time.time() - self.started, 3),
+            "stages": stages,
+        }
+
+
+_recorder = MetricsRecorder()
+
+
+def start_run():
+    """
+    Begin a new metrics run; the previous run's records are dropped.
+    """
+    global _recorder
+    _recorder = MetricsRecorder()
+    return _recorder
+
+
+def finish_run():
+    """
+    Return the rollup for the current run and write the Prometheus textfile.
+    """
+    rollup = _recorder.rollup()
+    if enabled and prometheus_textfile:
+        write_prometheus_textfile(rollup, prometheus_textfile)
+    return rollup
+
+
+def record(stage_name, seconds, ok=True, **fields):
+    """
+    Add a record for a stage that was timed elsewhere, e.g. queue wait.
+    """
+    _recorder.add(
+        {"stage": stage_name, "seconds": round(seconds, 6), "ok": ok, **fields}
+    )
+
+
+def annotate(**fields):
+    """
+    Attach fields such as bytes or retries to the innermost running stage.
+    """
+    stack = getattr(_local, "stack", None)
+    if stack:
+        stack[-1].update(fields)
+
+
+@contextmanager
+def stage(stage_name, **fields):
+    """
+    Time a block of code as a stage. Set record["ok"] = False inside the
+    block to mark it failed without raising.
+    """
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+
+    entry = {"stage": stage_name, "ok": True, **fields}
+    stack.append(entry)
+    started = time.monotonic()
+    try:
+        yield entry
+    except Exception:
+        entry["ok"] = False
+        raise
+    finally:
+        stack.pop()
+        entry["seconds"] = round(time.monotonic() - started, 6)
+        _recorder.add(entry)
+
+
+def timed(stage_name, key_arg=0, failure_values=(None, False)):
+    """
+    Decorator that records a stage for every call of the wrapped function.
+
+    Args:
+        stage_name (str): Stage name written to the metrics records.
+        key_arg (int): Index of the positional argument used as the record key.
+        failure_values (tuple): Return values that count as a failed stage.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = args[key_arg] if len(args) > key_arg else None
+            with stage(stage_name, key=key) as entry:
+                result = func(*args, **kwargs)
+                if any(result is value for value in failure_values):
+                    entry["ok"] = False
+                return result
+
+        return wrapper
+
+    return decorator
+
+
+def write_prometheus_textfile(rollup, path):
+    """
+    Write the run rollup in the node_exporter textfile collector format.
+    """
+    lines = [
+        "# HELP adstream_stage_seconds_total Time spent per stage in the last run.",
+        "# TYPE adstream_stage_seconds_total gauge",
+    ]
+    for name, summary in rollup["stages"].items():
+        lines.append(
+            f'adstream_stage_seconds_total{{stage="{name}"}} {summary["seconds"]}'
+        )
+    lines += [
+        "# HELP adstream_stage_calls_total Calls per stage in the last run.",
+        "# TYPE adstream_stage_calls_total gauge",
+    ]
+    for name, summary in rollup["stages"].items():
+        lines.append(f'adstream_stage_calls_total{{stage="{name}"}} {summary["count"]}')
+    lines += [
+        "# HELP adstream_stage_failures_total Failed calls per stage in the last run.",
+        "# TYPE adstream_stage_failures_total gauge",
+    ]
+    for name, summary in rollup["stages"].items():
+        lines.append(
+            f'adstream_stage_failures_total{{stage="{name}"}} {summary["failed"]}'
+        )
+    lines += [
+        "# HELP adstream_stage_bytes_total Bytes transferred per stage in the last run.",
+        "# TYPE adstream_stage_bytes_total gauge",
+    ]
+    for name, summary in rollup["stages"].items():
+        if "bytes" in summary:
+            lines.append(
+                f'adstream_stage_bytes_total{{stage="{name}"}} {summary["bytes"]}'
+            )
+    lines += [
+        "# HELP adstream_run_seconds Duration of the last run.",
+        "# TYPE adstream_run_seconds gauge",
+        f"adstream_run_seconds {rollup['run_seconds']}",
+    ]
+
+    try:
+        with atomic_file.atomic_write(path) as f:
+            f.write("\n".join(lines) + "\n")
+    except OSError as e:
+        logger.error(f"Unable to write Prometheus textfile {path}: {e}")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PathMapper:
+    """
+    Maps Windows drive and UNC paths from Vantage onto local mount points.
+
+    The configured roots are split into path components and stored in a
+    prefix trie, matched case-insensitively the way Windows does. Resolving
+    a path walks the trie once and joins the remaining components onto the
+    longest matching root's mount point, so nested roots work and no
+    intermediate path objects are built. Paths that are already POSIX are
+    returned unchanged.
+    """
+
+    def __init__(self, mappings):
+        self._root = {}
+        for prefix, mount_point in mappings.items():
+            node = self._root
+            for part in split_windows_path(prefix):
+                node = node.setdefault(part.casefold(), {})
+            node[None] = mount_point.rstrip("/")
+
+    def resolve(self, path):
+        """
+        Return (posix_path, parts) for a Vantage path, where parts are the
+        components below the matched root.
+
+        Raises:
+            ValueError: No configured root matches the path.
+        """
+        path = str(path)
+        if path.startswith("/"):
+            return path, [part for part in path.split("/") if part]
+
+        parts = split_windows_path(path)
+        node = self._root
+        match = None
+        for depth, part in enumerate(parts):
+            node = node.get(part.casefold())
+            if node is None:
+                break
+            if None in node:
+                match = (node[None], depth + 1)
+
+        if match is None:
+            raise ValueError(f"No path mapping configured for '{path}'")
+
+        mount_point, depth = match
+        remainder = parts[depth:]
+        return "/".join([mount_point] + remainder), remainder
+
+
+class FolderIndex:
+    """
+    Validated Adstream folder name -> folderId table, built once from the
+    config. Lookups are exact first, then case-insensitive.
+    """
+
+    def __init__(self, folders):
+        self._folders = {}
+        self._folded = {}
+        for name, folder_id in folders.items():
+            if not isinstance(folder_id, (str, int)) or folder_id == "":
+                logger.error(
+                    f"Adstream folder '{name}' has no valid folder id in the config, ignoring it."
+                )
+                continue
+            self._folders[name] = str(folder_id)
+            self._folded.setdefault(name.casefold(), str(folder_id))
+
+    def __len__(self):
+        return len(self._folders)
+
+    def items(self):
+        return self._folders.items()
+
+    def get(self, name):
+        """
+        Return the folderId for a folder name.
+
+        Raises:
+            ValueError: The folder is not in the Adstream folder list.
+        """
+        folder_id = self._folders.get(name) or self._folded.get(name.casefold())
+        if folder_id is None:
+            raise ValueError(
+                f"Folder '{name}' is not in the Adstream folder list in the config"
+            )
+        return folder_id
+
+
+def split_windows_path(path):
+    """
+    Split a Windows path into components. A UNC server keeps its leading
+    backslashes so \\\\server\\share never matches a drive or relative path.
+    """
+    path = str(path).replace("/", "\\")
+    parts = [part for part in path.split("\\") if part]
+    if path.startswith("\\\\") and parts:
+        parts[0] = "\\\\" + parts[0]
+    return parts
+
+
+def mappings_from_config(paths_config):
+    """
+    Build the prefix -> mount point table from the paths section: the
+    quan2 T: drive, the fsis3 UNC share, and any extra `mappings`.
+    """
+    mappings = {
+        "T:\\": paths_config["root_quan2_posix"],
+        "\\\\fsis3-smb\\fsis3\\": paths_config["root_fsis3_posix"],
+        paths_config["root_unc"]: paths_config["root_fsis3_posix"],
+    }
+    mappings.update(paths_config.get("mappings", {}))
+    return mappings
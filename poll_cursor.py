@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import logging
+import os
+import threading
+
+import atomic_file
+import config as cfg
+
+config = cfg.get_config()
+logger = logging.getLogger(__name__)
+
+script_root = config["paths"]["script_root"]
+cursor_dir = os.path.join(script_root, "json")
+
+_cursors = {}
+_cursors_lock = threading.Lock()
+
+
+class PollCursor:
+    """
+    Persisted view of a workflow's job list as of the last poll.
+
+    The cursor holds the state of every job seen last time, a digest of the
+    whole list, and the job ids that were handed to discovery but may not
+    have uploaded yet. Only jobs that are new, have changed state, or are
+    still pending need to be checked on the next poll.
+    """
+
+    def __init__(self, workflow, path):
+        self.workflow = workflow
+        self.path = path
+        self.digest = None
+        self.job_states = {}
+        self.pending = set()
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Unable to read poll cursor {self.path}, starting fresh: {e}")
+            return
+
+        self.digest = data.get("digest")
+        self.job_states = data.get("job_states", {})
+        self.pending = set(data.get("pending", []))
+
+    def save(self):
+        """
+        Write the cursor atomically so a crash never leaves a partial file.
+        """
+        data = {
+            "workflow": self.workflow,
+            "digest": self.digest,
+            "job_states": self.job_states,
+            "pending": sorted(self.pending),
+        }
+        with atomic_file.atomic_write(self.path) as f:
+            json.dump(data, f)
+
+    def is_unchanged(self, jobs_list):
+        return self.digest == jobs_digest(jobs_list)
+
+    def changed_jobs(self, jobs_list):
+        """
+        Return the jobs that are new, have changed state, or are pending.
+        """
+        return [
+            job
+            for job in jobs_list
+            if self.job_states.get(job["Identifier"]) != job["State"]
+            or job["Identifier"] in self.pending
+        ]
+
+    def update(self, jobs_list, pending_job_ids):
+        """
+        Record the job list from this poll and the job ids still in flight.
+        """
+        self.digest = jobs_digest(jobs_list)
+        self.job_states = {job["Identifier"]: job["State"] for job in jobs_list}
+        self.pending = set(pending_job_ids)
+
+    def settle(self, job_ids):
+        """
+        Stop treating jobs as pending once discovery has found there is
+        nothing to upload for them, e.g. _DeployToAdStream jobs or jobs
+        without variables. They are checked again only if their state
+        changes.
+        """
+        self.pending.difference_update(job_ids)
+
+
+def jobs_digest(jobs_list):
+    """
+    Digest of the (Identifier, State) pairs in a job list.
+
+    The pairs are sorted first, so every Vantage endpoint produces the same
+    digest for the same jobs regardless of the order it returns them in.
+    """
+    pairs = sorted((job["Identifier"], job["State"]) for job in jobs_list)
+    return hashlib.sha1(json.dumps(pairs).encode("utf-8")).hexdigest()
+
+
+def get_cursor(workflow):
+    """
+    Return the cursor for a workflow, loading it from disk on first use.
+    """
+    with _cursors_lock:
+        if workflow not in _cursors:
+            path = os.path.join(cursor_dir, f"poll_cursor_{workflow}.json")
+            _cursors[workflow] = PollCursor(workflow, path)
+        return _cursors[workflow]
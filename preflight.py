@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import config as cfg
+
+config = cfg.get_config()
+logger = logging.getLogger(__name__)
+
+preflight_config = config.get("preflight", {})
+enabled = preflight_config.get("enabled", True)
+stable_seconds = preflight_config.get("stable_seconds", 5)
+quiet_seconds = preflight_config.get("quiet_seconds", 60)
+cache_seconds = preflight_config.get("cache_seconds", 600)
+stat_workers = preflight_config.get("workers", 8)
+
+READY = "ready"
+SETTLING = "settling"
+MISSING = "missing"
+CLAIMED = "claimed"
+
+
+class StatCache:
+    """
+    Last seen (size, mtime) of each candidate file and when it was first
+    seen with those values.
+
+    A file is ready once its size and mtime have not changed for
+    stable_seconds of observation, or its mtime is already quiet_seconds
+    old. The cache lives for the whole process, so in daemon mode a file
+    deferred on one poll is usually confirmed stable on the next without
+    waiting again.
+    """
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def observe(self, path):
+        """
+        Stat a file and return READY, SETTLING or MISSING.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            with self._lock:
+                self._stats.pop(path, None)
+            return MISSING
+
+        now = time.time()
+        key = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            previous = self._stats.get(path)
+            if previous and previous[0] == key:
+                first_seen = previous[1]
+            else:
+                first_seen = now
+            self._stats[path] = (key, first_seen, now)
+
+        if stat.st_size == 0:
+            return SETTLING
+        if now - stat.st_mtime >= quiet_seconds or now - first_seen >= stable_seconds:
+            return READY
+        return SETTLING
+
+    def size(self, path):
+        """
+        Return the cached size of a file, or None if it has not been seen.
+        """
+        with self._lock:
+            entry = self._stats.get(path)
+        return entry[0][0] if entry else None
+
+    def prune(self):
+        """
+        Drop entries for files not stat'd in the last cache_seconds.
+        """
+        cutoff = time.time() - cache_seconds
+        with self._lock:
+            self._stats = {
+                path: entry for path, entry in self._stats.items() if entry[2] >= cutoff
+            }
+
+
+stat_cache = StatCache()
+
+
+def check(media):
+    """
+    Return the readiness of a media dict's file. Always READY when the
+    pre-flight stage is disabled.
+    """
+    if not enabled:
+        return READY
+    return stat_cache.observe(media["File Path"])
+
+
+def settle(held):
+    """
+    Wait out the stability window for media that were still settling, then
+    stat them again in parallel.
+
+    Args:
+        held (list of (dict, float)): Media and the time each was first held.
+
+    Returns:
+        tuple: (ready media, deferred media)
+    """
+    if not held:
+        return [], []
+
+    wait = stable_seconds - (time.time() - max(held_at for _, held_at in held))
+    if wait > 0:
+        logger.info(
+            f"Waiting {wait:.1f}s for {len(held)} files still being written to settle."
+        )
+        time.sleep(wait)
+
+    media_list = [media for media, _ in held]
+    with ThreadPoolExecutor(
+        max_workers=min(stat_workers, len(media_list)), thread_name_prefix="preflight"
+    ) as executor:
+        states = list(executor.map(check, media_list))
+
+    ready = [media for media, state in zip(media_list, states) if state == READY]
+    deferred = [media for media, state in zip(media_list, states) if state != READY]
+    return ready, deferred
+
+
+def log_deferred(media, state=SETTLING):
+    if state == MISSING:
+        reason = "is not on the volume yet"
+    elif state == CLAIMED:
+        reason = "is being uploaded from the hot folder"
+    else:
+        reason = "is still being written"
+    logger.info(
+        f"Deferring Job ID {media['Job Id']} to the next poll: "
+        f"{media['File Path']} {reason}."
+    )
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Tokens refill continuously at `rate` per second up to `capacity`. acquire()
+    blocks until enough tokens are available, so callers are spread out over
+    time instead of sleeping a fixed interval before every request.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def acquire(self, tokens=1):
+        """
+        Take `tokens` from the bucket, blocking until they are available.
+        Returns the number of seconds spent waiting.
+
+        A request larger than the bucket is let through once the bucket is
+        full and leaves it in debt, which later callers wait out.
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        needed = min(tokens, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= needed:
+                    self._tokens -= tokens
+                    return waited
+                delay = (needed - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit on how many uploads run at once.
+
+    Every healthy transfer raises the limit by 1/limit, i.e. about one slot
+    per round of uploads. A throttled or failed transfer (429/5xx, retries,
+    or rising latency) halves it, never below `minimum`. After a decrease,
+    further congestion signals are ignored for `cooldown` seconds so one
+    burst of errors from uploads already in flight only halves the limit
+    once.
+
+    Latency is the time per MB of a transfer, tracked separately for each
+    power-of-two size class because small files pay more per MB in request
+    overhead. Each class keeps a short moving average of recent transfers
+    and a slow one as its baseline; latency is rising when the short
+    average is more than `latency_factor` times the baseline. The baseline
+    keeps following new transfers, so a link that is slower for good stops
+    counting as congestion after a while.
+
+    Uploads are taken as large or small. A small upload may start when no
+    other small upload is running even if large ones hold every slot, so a
+    lane of long-form masters can exceed the limit by one but never starve
+    the short promos.
+    """
+
+    SHORT_ALPHA = 0.5
+    BASELINE_ALPHA = 0.05
+    MIN_SAMPLES = 3
+
+    def __init__(
+        self, initial, minimum=1, maximum=None, latency_factor=1.5, cooldown=10
+    ):
+        self.minimum = max(minimum, 1)
+        self.maximum = maximum or initial
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.latency_factor = latency_factor
+        self.cooldown = cooldown
+        self.active = 0
+        self.active_small = 0
+        self._decreased_at = None
+        self._latency = {}
+        self._condition = threading.Condition()
+
+    def acquire(self, large=False):
+        with self._condition:
+            while self.active >= int(self.limit) and (large or self.active_small > 0):
+                self._condition.wait()
+            self.active += 1
+            if not large:
+                self.active_small += 1
+
+    def release(self, large=False):
+        with self._condition:
+            self.active -= 1
+            if not large:
+                self.active_small -= 1
+            self._condition.notify_all()
+
+    def on_success(self, seconds_per_mb=None, size_bytes=0):
+        with self._condition:
+            if seconds_per_mb and self._latency_rising(seconds_per_mb, size_bytes):
+                self._decrease("latency rising")
+                return
+            self.limit = min(self.limit + 1 / self.limit, self.maximum)
+            self._condition.notify_all()
+
+    def on_congestion(self, reason):
+        with self._condition:
+            self._decrease(reason)
+
+    def _latency_rising(self, seconds_per_mb, size_bytes):
+        size_class = int(size_bytes).bit_length()
+        stats = self._latency.get(size_class)
+        if stats is None:
+            self._latency[size_class] = [seconds_per_mb, seconds_per_mb, 1]
+            return False
+
+        stats[0] += self.SHORT_ALPHA * (seconds_per_mb - stats[0])
+        stats[1] += self.BASELINE_ALPHA * (seconds_per_mb - stats[1])
+        stats[2] += 1
+        return (
+            stats[2] >= self.MIN_SAMPLES and stats[0] > stats[1] * self.latency_factor
+        )
+
+    def _decrease(self, reason):
+        now = time.monotonic()
+        if self._decreased_at and now - self._decreased_at < self.cooldown:
+            return
+        self._decreased_at = now
+
+        new_limit = max(self.limit / 2, self.minimum)
+        if int(new_limit) < int(self.limit):
+            logger.info(
+                f"Upload concurrency reduced from {int(self.limit)} to "
+                f"{int(new_limit)}: {reason}"
+            )
+        self.limit = new_limit
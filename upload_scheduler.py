@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+import logging
+import os
+import threading
+import time
+
+import config as cfg
+import preflight
+
+config = cfg.get_config()
+logger = logging.getLogger(__name__)
+
+scheduler_config = config.get("scheduler", {})
+large_file_bytes = scheduler_config.get("large_file_mb", 2048) * 1024 * 1024
+large_lane_workers = scheduler_config.get("large_lane_workers", 1)
+aging_seconds = scheduler_config.get("aging_seconds", 600)
+folder_priority = scheduler_config.get("folder_priority", {})
+
+SMALL = "small"
+LARGE = "large"
+
+
+class UploadScheduler:
+    """
+    Orders queued media by priority, age and size, and runs them on two
+    lanes of worker threads.
+
+    Files at or above large_file_mb go to the large lane, which has its own
+    workers, so one long-form master never blocks the short promos behind
+    it. Large-lane workers pick up small files when no large file is
+    waiting; small-lane workers never take large files.
+
+    Within a lane the next item is the one with the highest priority, where
+    priority grows by one for every aging_seconds spent waiting, then the
+    smallest file.
+    """
+
+    def __init__(self, handler, workers):
+        self.handler = handler
+        self.workers = max(workers, 1)
+        self.large_workers = min(large_lane_workers, self.workers - 1)
+        self._queues = {SMALL: [], LARGE: []}
+        self._condition = threading.Condition()
+        self._closed = False
+        self._threads = []
+
+    def start(self):
+        lanes = [LARGE] * self.large_workers
+        lanes += [SMALL] * (self.workers - self.large_workers)
+        for number, lane in enumerate(lanes):
+            thread = threading.Thread(
+                target=self._run,
+                args=(lane,),
+                name=f"upload-{lane}-{number}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def submit(self, media):
+        item = {
+            "media": media,
+            "size": media_size(media),
+            "priority": media_priority(media),
+            "queued_at": time.monotonic(),
+        }
+        lane = (
+            LARGE if item["size"] >= large_file_bytes and self.large_workers else SMALL
+        )
+        with self._condition:
+            self._queues[lane].append(item)
+            self._condition.notify_all()
+
+    def close(self):
+        """
+        Stop accepting work; workers exit once the queues are drained.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def _next(self, lane):
+        with self._condition:
+            while True:
+                queue = self._queues[lane]
+                if lane == LARGE and not queue:
+                    queue = self._queues[SMALL]
+                if queue:
+                    item = max(queue, key=rank)
+                    queue.remove(item)
+                    return item
+                if self._closed:
+                    return None
+                self._condition.wait()
+
+    def _run(self, lane):
+        while True:
+            item = self._next(lane)
+            if item is None:
+                return
+            try:
+                self.handler(item["media"], item["queued_at"])
+            except Exception as e:
+                logger.error(f"Unhandled exception in upload worker: {e}")
+
+
+def rank(item):
+    waited = time.monotonic() - item["queued_at"]
+    return (item["priority"] + waited // aging_seconds, -item["size"])
+
+
+def media_size(media):
+    size = preflight.stat_cache.size(media["File Path"])
+    if size is not None:
+        return size
+    try:
+        return os.path.getsize(media["File Path"])
+    except OSError:
+        return 0
+
+
+def media_priority(media):
+    """
+    Priority from the Vantage "Priority" job variable if set, otherwise from
+    scheduler.folder_priority for the destination folder. Higher runs first.
+    """
+    try:
+        return float(media["Priority"])
+    except (KeyError, TypeError, ValueError):
+        return float(folder_priority.get(media.get("folderId"), 0))
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+import config as cfg
+import upload_scheduler
+
+config = cfg.get_config()
+logger = logging.getLogger(__name__)
+
+queue_config = config.get("queue", {})
+# No default: the discover and worker hosts must all open the same database,
+# so it has to live on a shared volume named in config.
+queue_path = queue_config.get("path")
+lease_seconds = queue_config.get("lease_seconds", 300)
+heartbeat_seconds = queue_config.get("heartbeat_seconds", 60)
+max_attempts = queue_config.get("max_attempts", 5)
+poll_seconds = queue_config.get("poll_seconds", 5)
+retry_seconds = queue_config.get("retry_seconds", 60)
+
+QUEUED = "queued"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    job_id TEXT PRIMARY KEY,
+    media TEXT NOT NULL,
+    state TEXT NOT NULL,
+    priority REAL NOT NULL DEFAULT 0,
+    enqueued_at REAL NOT NULL,
+    available_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    done_seq INTEGER
+);
+CREATE INDEX IF NOT EXISTS items_claim ON items (state, available_at);
+"""
+DONE_SEQ_INDEX = "CREATE INDEX IF NOT EXISTS items_done ON items (done_seq)"
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+class WorkQueue:
+    """
+    Durable upload queue shared by every uploader host, kept in a SQLite
+    database on the shared volume.
+
+    Discovery enqueues media; workers claim items under a lease of
+    lease_seconds, renew it with heartbeat() while they work, and mark each
+    item done or hand it back to be retried after retry_seconds. An item
+    whose lease has expired, because its
+    worker died or lost the volume, can be claimed by any other worker.
+    After max_attempts claims an item is parked as failed until discovery
+    enqueues it again.
+
+    Claims run inside BEGIN IMMEDIATE transactions so two hosts never take
+    the same item. The rollback journal is used rather than WAL, which
+    needs shared memory that network filesystems do not provide. Leases
+    compare wall-clock times across hosts, so the hosts' clocks must be
+    roughly in sync; lease_seconds leaves a wide margin. Finished items are
+    numbered from a sequence in the database rather than by time, so
+    discovery can follow them with done_since() whatever the hosts' clocks
+    say.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        connection = self._connection()
+        connection.executescript(SCHEMA)
+        columns = [row[1] for row in connection.execute("PRAGMA table_info(items)")]
+        if "done_seq" not in columns:
+            connection.execute("ALTER TABLE items ADD COLUMN done_seq INTEGER")
+            connection.execute(
+                "UPDATE items SET done_seq = rowid WHERE state = ?", (DONE,)
+            )
+        connection.execute(DONE_SEQ_INDEX)
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=DELETE")
+            self._local.connection = connection
+        return connection
+
+    def _transaction(self, statements):
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            result = statements(connection)
+            connection.execute("COMMIT")
+            return result
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def enqueue(self, media):
+        """
+        Add media to the queue. A job that is already queued, leased or
+        done is left alone; a failed one is queued again.
+
+        Returns:
+            bool: True if the item was added or re-queued.
+        """
+        now = time.time()
+        cursor = self._connection().execute(
+            """
+            INSERT INTO items (
+                job_id, media, state, priority, enqueued_at, available_at, updated_at
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (job_id) DO UPDATE SET
+                media = excluded.media,
+                state = excluded.state,
+                attempts = 0,
+                available_at = excluded.available_at,
+                updated_at = excluded.updated_at
+            WHERE items.state = ?
+            """,
+            (
+                media["Job Id"],
+                json.dumps(media),
+                QUEUED,
+                upload_scheduler.media_priority(media),
+                now,
+                now,
+                now,
+                FAILED,
+            ),
+        )
+        return cursor.rowcount > 0
+
+    def claim(self, owner, limit=1):
+        """
+        Lease up to `limit` queued or expired items to `owner`, highest
+        priority then oldest first.
+
+        Returns:
+            list of dict: The claimed media.
+        """
+
+        def statements(connection):
+            now = time.time()
+            rows = connection.execute(
+                """
+                SELECT job_id, media, attempts FROM items
+                WHERE (state = ? AND available_at <= ?)
+                    OR (state = ? AND lease_expires < ?)
+                ORDER BY priority DESC, enqueued_at
+                LIMIT ?
+                """,
+                (QUEUED, now, LEASED, now, limit),
+            ).fetchall()
+
+            claimed = []
+            for job_id, media, attempts in rows:
+                if attempts >= max_attempts:
+                    logger.error(
+                        f"Job ID {job_id} failed {attempts} attempts, parking it."
+                    )
+                    connection.execute(
+                        "UPDATE items SET state = ?, lease_owner = NULL, "
+                        "updated_at = ? WHERE job_id = ?",
+                        (FAILED, now, job_id),
+                    )
+                    continue
+                connection.execute(
+                    "UPDATE items SET state = ?, lease_owner = ?, lease_expires = ?, "
+                    "attempts = attempts + 1, updated_at = ? WHERE job_id = ?",
+                    (LEASED, owner, now + lease_seconds, now, job_id),
+                )
+                claimed.append(json.loads(media))
+            return claimed
+
+        return self._transaction(statements)
+
+    def heartbeat(self, owner):
+        """
+        Extend the lease on every item `owner` holds.
+        """
+        now = time.time()
+        self._connection().execute(
+            "UPDATE items SET lease_expires = ?, updated_at = ? "
+            "WHERE state = ? AND lease_owner = ?",
+            (now + lease_seconds, now, LEASED, owner),
+        )
+
+    def complete(self, job_id, owner):
+        self._finish(job_id, owner, DONE)
+
+    def release(self, job_id, owner):
+        """
+        Hand a failed item back to the queue for another attempt after
+        retry_seconds.
+        """
+        self._finish(job_id, owner, QUEUED, delay=retry_seconds)
+
+    def _finish(self, job_id, owner, state, delay=0):
+        now = time.time()
+        cursor = self._connection().execute(
+            "UPDATE items SET state = ?, lease_owner = NULL, lease_expires = NULL, "
+            "available_at = ?, updated_at = ?, done_seq = CASE WHEN ? = ? "
+            "THEN (SELECT COALESCE(MAX(done_seq), 0) + 1 FROM items) END "
+            "WHERE job_id = ? AND state = ? AND lease_owner = ?",
+            (state, now + delay, now, state, DONE, job_id, LEASED, owner),
+        )
+        if cursor.rowcount == 0:
+            logger.error(
+                f"Lease on Job ID {job_id} was lost before it finished, "
+                "another worker may have reclaimed it."
+            )
+
+    def done_since(self, since):
+        """
+        Return (job ids finished after sequence number `since`, latest
+        sequence number).
+        """
+        rows = (
+            self._connection()
+            .execute(
+                "SELECT job_id, done_seq FROM items WHERE state = ? AND done_seq > ?",
+                (DONE, since),
+            )
+            .fetchall()
+        )
+        latest = max((done_seq for _, done_seq in rows), default=since)
+        return [job_id for job_id, _ in rows], latest
+
+    def counts(self):
+        rows = (
+            self._connection()
+            .execute("SELECT state, COUNT(*) FROM items GROUP BY state")
+            .fetchall()
+        )
+        return dict(rows)
+
+
+class QueueConsumer:
+    """
+    Feeds claimed items to an upload scheduler without claiming more than
+    `max_in_flight` at once, so nothing sits in the local queue while its
+    lease runs down. A heartbeat thread renews the leases it holds until
+    close() is called, which the caller does once every claimed item has
+    finished, so leases stay alive while a stopping worker drains.
+    """
+
+    def __init__(self, work_queue, max_in_flight, owner=None):
+        self.queue = work_queue
+        self.max_in_flight = max(max_in_flight, 1)
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self.in_flight = 0
+        self._condition = threading.Condition()
+        self._closed = threading.Event()
+
+    def iter_media(self, stop_event):
+        """
+        Yield claimed media until `stop_event` is set.
+        """
+        heartbeat = threading.Thread(target=self._heartbeat, name="queue-heartbeat")
+        heartbeat.daemon = True
+        heartbeat.start()
+        logger.info(f"Upload worker {self.owner} claiming from {self.queue.path}")
+
+        while not stop_event.is_set():
+            with self._condition:
+                while self.in_flight >= self.max_in_flight and not stop_event.is_set():
+                    self._condition.wait(poll_seconds)
+                free = self.max_in_flight - self.in_flight
+
+            if stop_event.is_set():
+                break
+
+            try:
+                claimed = self.queue.claim(self.owner, limit=free)
+            except sqlite3.Error as e:
+                logger.error(f"Unable to claim from the work queue: {e}")
+                claimed = []
+
+            if not claimed:
+                stop_event.wait(poll_seconds)
+                continue
+
+            with self._condition:
+                self.in_flight += len(claimed)
+            yield from claimed
+
+    def on_result(self, media, uploaded):
+        try:
+            if uploaded:
+                self.queue.complete(media["Job Id"], self.owner)
+            else:
+                self.queue.release(media["Job Id"], self.owner)
+        except sqlite3.Error as e:
+            logger.error(f"Unable to update Job ID {media['Job Id']} in the queue: {e}")
+        finally:
+            with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+    def close(self):
+        """
+        Stop renewing leases. Call once no claimed item is still in flight.
+        """
+        if self.in_flight:
+            logger.error(
+                f"Closing upload worker {self.owner} with {self.in_flight} "
+                "items still leased."
+            )
+        self._closed.set()
+
+    def _heartbeat(self):
+        while not self._closed.wait(heartbeat_seconds):
+            try:
+                self.queue.heartbeat(self.owner)
+            except sqlite3.Error as e:
+                logger.error(f"Work queue heartbeat failed: {e}")
+
+
+def get_queue():
+    """
+    Return the work queue for this process, opening it on first use.
+    """
+    global _queue
+
+    if not queue_path:
+        raise ValueError(
+            "queue.path is not set; point it at a database on a volume shared "
+            "by the discover and worker hosts"
+        )
+
+    with _queue_lock:
+        if _queue is None:
+            _queue = WorkQueue(queue_path)
+    return _queue